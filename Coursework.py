@@ -1,6 +1,24 @@
+import argparse
+import atexit
+import bisect
+import hashlib
+import mmap
 import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows locks files through msvcrt instead
+    fcntl = None
+    import msvcrt
+
 
 class Singleton(type):
     """Singleton metaclass"""
@@ -22,67 +40,433 @@ class RomanNumeralOutOfRangeError(ValueError):
     pass
 
 
+class LatencyHistogram:
+    """Histogram of durations in seconds with fixed exponential buckets (0.25 microseconds to about 16 seconds)"""
+    BOUNDS = tuple(0.25e-6 * 2 ** i for i in range(27))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # The last bucket holds everything above the largest bound
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, percent):
+        """Estimates a percentile by interpolating inside the bucket that contains it"""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.BOUNDS[i - 1] if i > 0 else 0.0
+                upper = self.BOUNDS[i] if i < len(self.BOUNDS) else self.BOUNDS[-1]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.BOUNDS[-1]
+
+
+class StageTimer:
+    """Context manager that records the time spent in its block into one stage histogram"""
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Per-stage latency histograms. Instrumented code checks enabled first, so disabled metrics cost one lookup."""
+    STAGES = ("classify", "validate", "convert", "log_io")
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        self.server = None
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def timer(self, stage):
+        return StageTimer(self, stage)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.histograms[stage].observe(seconds)
+
+    def summary(self):
+        """Returns one line per stage with its call count and p50/p95/p99 latency in microseconds"""
+        lines = []
+        with self.lock:
+            for stage, histogram in self.histograms.items():
+                lines.append(f"{stage:>8}: {histogram.count} calls, p50 {histogram.percentile(50) * 1e6:.1f} us,"
+                             f" p95 {histogram.percentile(95) * 1e6:.1f} us,"
+                             f" p99 {histogram.percentile(99) * 1e6:.1f} us")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """Renders the histograms in the Prometheus text exposition format"""
+        name = "coursework_stage_duration_seconds"
+        lines = [f"# HELP {name} Time spent in each conversion stage.", f"# TYPE {name} histogram"]
+        with self.lock:
+            for stage, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.BOUNDS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:.9g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.9g}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Enables metrics and serves them for Prometheus at http://host:port/metrics from a daemon thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only needed when serving
+        metrics = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the interactive output
+
+        self.enable()
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+
+METRICS = Metrics()
+
+
+class ConversionTable:
+    """Lookup tables for both conversion directions, built once for the supported range (1-3999)"""
+    DECIMAL_TO_ROMAN = (
+        (1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'),
+        (100, 'C'), (90, 'XC'), (50, 'L'), (40, 'XL'),
+        (10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I')
+    )
+
+    def __init__(self, minimum=1, maximum=3999):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.to_roman = [''] * (maximum + 1)  # Index is the decimal value
+        for value in range(minimum, maximum + 1):
+            self.to_roman[value] = self.build_roman(value)
+        self.to_decimal = {roman: value for value, roman in enumerate(self.to_roman) if roman}
+
+    @classmethod
+    def build_roman(cls, decimal_num):
+        """Builds the Roman numeral for any integer with the greedy subtraction algorithm"""
+        symbols = []
+        for value, symbol in cls.DECIMAL_TO_ROMAN:
+            count, decimal_num = divmod(decimal_num, value) if decimal_num > 0 else (0, decimal_num)
+            symbols.append(symbol * count)
+        return ''.join(symbols)
+
+    def roman(self, value):
+        """Returns the canonical Roman numeral for value, or None if it is outside the table"""
+        if isinstance(value, int) and self.minimum <= value <= self.maximum:
+            return self.to_roman[value]
+        return None
+
+    def decimal(self, roman):
+        """Returns the value of a canonical Roman numeral, or None if roman is not canonical"""
+        return self.to_decimal.get(roman)
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the entry for key and marks it as recently used, or None if it is not cached"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.evict()
+
+    def resize(self, maxsize):
+        """Changes the capacity, evicting entries if the cache shrinks; 0 disables caching"""
+        with self.lock:
+            self.maxsize = maxsize
+            self.evict()
+
+    def evict(self):
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drops every entry and resets the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self.entries), "maxsize": self.maxsize}
+
+
+class ConversionResult(namedtuple("ConversionResult", ("number", "direction", "rules", "error", "message"))):
+    """
+    Outcome of NumberFactory.parse, reported without raising.
+
+    number is the Number object, or None if the input was rejected. direction is "decimal_to_roman" or
+    "roman_to_decimal" once the input is recognised as a decimal or a Roman numeral, and rules holds the
+    violated ROMAN_NUMERAL_RULES as RomanValidator bits. For rejected input, error is the ValueError
+    subclass create_number raises and message its text; both are None otherwise.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
 class NumberFactory:
     """Factory class for creating Number objects"""
+    # Maps input strings to their ConversionResult
+    cache = LRUCache()
+    INVALID_INPUT = ConversionResult(None, None, 0, ValueError,
+                                     "Invalid input. Please enter a valid Roman numeral or decimal number.")
 
     @staticmethod
-    def create_number(value):
+    def create_number(value, extended=False, codec=None):
         """
         Factory method to create a Number object based on the input value.
 
         Args:
             value (str or int): The input value to create the Number object from.
+            extended (bool): Accept any positive value, using vinculum notation for Roman numerals above 3999.
+            codec (str): Name of the NUMERAL_CODECS format the input is written in ("decimal", "roman",
+                "lowercase", "apostrophus" or "medieval"), skipping detection. Not combined with extended.
 
         Returns:
-            Number: A new Number object (either DecimalNumber or RomanNumber).
+            Number: A new Number object (either DecimalNumber or RomanNumber, or their Extended
+            variants in extended mode).
 
         Raises:
             ValueError: If the input value is not a valid Roman numeral or decimal number.
             InvalidDecimalError: If the decimal input is outside the supported range (1-3999).
         """
-        # Check if the input contains both digits and letters
-        if any(char.isdigit() for char in value) and any(char.isalpha() for char in value):
-            raise ValueError("Invalid input. Please enter a valid Roman numeral or decimal number.")
+        result = NumberFactory.parse(value, extended, codec)
+        if result.error is not None:
+            raise result.error(result.message)
+        return result.number
 
-        # Check if the input is a valid decimal number
-        try:
-            decimal_value = int(value)
-            if decimal_value < 1 or decimal_value > 3999:
-                raise InvalidDecimalError(f"Decimal value {value} is outside the supported range (1-3999).")
-            else:
-                return DecimalNumber(decimal_value)
-        except ValueError:
-            pass  # Move to Roman numeral check
+    @staticmethod
+    def parse(value, extended=False, codec=None):
+        """
+        Classifies the input and builds the matching Number object, reporting invalid input
+        in the result instead of raising. See create_number for the arguments.
+
+        Canonical numerals and plain decimals of 1-3999 are answered from a prebuilt table;
+        only the other inputs, which need rule checks, go through the cache.
+
+        Returns:
+            ConversionResult: The Number object and direction, or the error create_number would raise.
+        """
+        if not isinstance(value, str):
+            value = str(value)
+        if not (extended or codec):
+            result = NumberFactory.canonical.get(value)
+            if result is not None:
+                return result
+        cache = NumberFactory.cache
+        if not cache.maxsize:
+            return NumberFactory.parse_uncached(value, extended, codec)
+
+        key = (value, extended, codec) if extended or codec else value
+        result = cache.get(key)
+        if result is None:
+            result = NumberFactory.parse_uncached(value, extended, codec)
+            cache.put(key, result)
+        return result
 
-        # Check if the input is a valid Roman numeral
-        if not all(char.isalpha() for char in value):
-            raise ValueError("Invalid input. Please enter a valid Roman numeral or decimal number.")
+    @staticmethod
+    def configure_cache(maxsize):
+        """Sets how many distinct non-canonical inputs parse remembers; 0 disables the cache"""
+        NumberFactory.cache.resize(maxsize)
+
+    @staticmethod
+    def parse_uncached(value, extended=False, codec=None):
+        """Classifies the input without consulting the cache, timing it when metrics are enabled"""
+        if not METRICS.enabled:
+            return NumberFactory.classify(value, extended, codec)
+        with METRICS.timer("classify"):
+            return NumberFactory.classify(value, extended, codec)
+
+    @staticmethod
+    def classify(value, extended=False, codec=None):
+        """Hands the input to the pinned codec, or to the one its character class selects, see parse"""
+        if codec is not None:
+            if extended:
+                raise ValueError("A pinned codec cannot be combined with extended mode.")
+            pinned = NUMERAL_CODECS.get(codec)
+            result = pinned.parse(value)
+            if result is None:
+                return ConversionResult(None, None, 0, ValueError, f"{value} is not a {pinned.description}.")
+            return result
+        if extended:
+            return NumberFactory.classify_extended(value)
+        detected = NUMERAL_CODECS.detect(value)
+        if detected is not None:
+            result = detected.parse(value)
+            if result is not None:
+                return result
+        return NumberFactory.classify_other(value)
+
+    @staticmethod
+    def classify_other(value):
+        """Classifies input that no codec accepts in one pass over its characters, see parse"""
+        if value.isascii() and value.isdigit():  # The common decimal case
+            try:
+                decimal_value = int(value)
+            except ValueError:  # More digits than int() converts
+                return NumberFactory.INVALID_INPUT
+        elif value.isalpha():  # The common Roman numeral case
+            return NumberFactory.classify_roman(value)
+        else:
+            # Signs, spaces, mixed or empty input
+            has_digit = has_alpha = False
+            for char in value:
+                if char.isdigit():
+                    has_digit = True
+                elif char.isalpha():
+                    has_alpha = True
+            if has_digit and has_alpha:
+                return NumberFactory.INVALID_INPUT
+            if not has_digit:  # int() needs at least one digit
+                return NumberFactory.classify_roman(value) if not value else NumberFactory.INVALID_INPUT
+            try:
+                decimal_value = int(value)
+            except ValueError:
+                return NumberFactory.INVALID_INPUT
+
+        if 0 < decimal_value < 4000:
+            return ConversionResult(DecimalNumber(decimal_value), "decimal_to_roman", 0, None, None)
+        return NumberFactory.INVALID_INPUT  # Decimals outside 1-3999 have always been rejected as invalid input
+
+    @staticmethod
+    def classify_roman(value):
+        """Checks a Roman numeral against the rules and the 1-3999 range, see parse"""
+        roman = value.upper()
+        if CONVERSION_TABLE.decimal(roman) is not None:  # Canonical numerals need no rule checks
+            return ConversionResult(RomanNumber(roman), "roman_to_decimal", 0, None, None)
+
+        invalid = roman.strip("IVXLCDM")
+        if invalid:  # Same message as the KeyError for the last character that is not a numeral
+            return ConversionResult(None, "roman_to_decimal", 0, ValueError, repr(invalid[-1]))
+
+        if METRICS.enabled:
+            with METRICS.timer("validate"):
+                decimal_value, violated_rules = ROMAN_VALIDATOR.scan(roman)
+        else:
+            decimal_value, violated_rules = ROMAN_VALIDATOR.scan(roman)
+        if violated_rules:
+            return ConversionResult(None, "roman_to_decimal", violated_rules, ValueError,
+                                    f"Invalid Roman numeral: {roman}.  "
+                                    + ", ".join(text for _, text in ROMAN_VALIDATOR.describe(violated_rules)))
+        # Only the empty numeral gets here, every other non-canonical numeral breaks a rule
+        return ConversionResult(None, "roman_to_decimal", 0, ValueError,
+                                f"Roman numeral {value} represents a value outside the supported range (1-3999).")
 
+    @staticmethod
+    def classify_extended(value):
+        """Classifies the input without the 3999 limit, see parse"""
+        decimal_value = None
+        if value.isascii() and value.isdigit():
+            try:
+                decimal_value = int(value)
+            except ValueError:  # More digits than int() converts
+                return ConversionResult(None, "decimal_to_roman", 0, InvalidDecimalError,
+                                        f"Decimal value {value} has too many digits to convert.")
+        elif not value.isalpha() and any(char.isdigit() for char in value):  # int() needs at least one digit
+            try:
+                decimal_value = int(value)
+            except ValueError:
+                pass
+        if decimal_value is not None:
+            if decimal_value < 1:
+                return ConversionResult(None, "decimal_to_roman", 0, InvalidDecimalError,
+                                        f"Decimal value {value} is outside the supported range (1 or more).")
+            return ConversionResult(ExtendedDecimalNumber(decimal_value), "decimal_to_roman", 0, None, None)
+
+        if not all(char.isalpha() or char == VinculumCodec.OVERLINE for char in value):
+            return NumberFactory.INVALID_INPUT
+        roman = value.upper()
         try:
-            roman_num = RomanNumber(value.upper())
-            conversion_result = roman_num.convert()
-            if isinstance(conversion_result, tuple):
-                decimal_value, violated_rules = conversion_result
-                if decimal_value < 1 or decimal_value > 3999:
-                    raise RomanNumeralOutOfRangeError(f"Roman numeral {value} represents"
-                                                      f" a value outside the supported range (1-3999).")
-                if violated_rules:
-                    raise ValueError(", ".join([rule[1] for rule in violated_rules]))
-            else:
-                decimal_value = conversion_result
-                if decimal_value < 1 or decimal_value > 3999:
-                    raise RomanNumeralOutOfRangeError(f"Roman numeral {value} represents"
-                                                      f" a value outside the supported range (1-3999).")
-            return roman_num
+            VINCULUM.decode(roman)
         except (KeyError, ValueError) as e:
-            raise ValueError(str(e))
+            return ConversionResult(None, "roman_to_decimal", 0, ValueError, str(e))
+        return ConversionResult(ExtendedRomanNumber(roman), "roman_to_decimal", 0, None, None)
 
 
 class Number:
-    """Abstract base class for numbers"""
+    """Abstract base class for numbers. Instances are immutable, so subclasses may hand out shared ones."""
+    __slots__ = ("value",)
+
+    def __new__(cls, value):
+        number = super().__new__(cls)
+        object.__setattr__(number, "value", value)
+        return number
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable")
+
+    def __reduce__(self):
+        return self.__class__, (self.value,)
 
-    def __init__(self, value):
-        self.value = value
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and self.value == other.value
+
+    def __hash__(self):
+        return hash((self.__class__, self.value))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.value!r})"
 
     def __str__(self):
         return str(self.value)
@@ -94,24 +478,34 @@ class Number:
 
 class DecimalNumber(Number):
     """Class representing a decimal number"""
+    __slots__ = ()
+    pool = ()  # Shared instances for 1-3999, indexed by value and filled in once the tables are built
+
+    def __new__(cls, value):
+        if cls is DecimalNumber and type(value) is int and 0 < value < len(cls.pool):
+            return cls.pool[value]
+        return super().__new__(cls, value)
 
     def convert(self):
         """Converts the decimal number to a Roman numeral"""
-        decimal_to_roman = {
-            1: 'I', 4: 'IV', 5: 'V', 9: 'IX',
-            10: 'X', 40: 'XL', 50: 'L', 90: 'XC',
-            100: 'C', 400: 'CD', 500: 'D', 900: 'CM', 1000: 'M'
-        }
-        roman_num = ''
-        decimal_num = self.value
-        for value, symbol in sorted(decimal_to_roman.items(), reverse=True):
-            while decimal_num >= value:
-                roman_num += symbol
-                decimal_num -= value
+        roman_num = CONVERSION_TABLE.roman(self.value)
+        if roman_num is None:  # Outside the precomputed range
+            roman_num = ConversionTable.build_roman(self.value)
         return RomanNumber(roman_num)
 
 
 class RomanNumber(Number):
+    """Class representing a Roman numeral"""
+    __slots__ = ()
+    pool = {}  # Shared instances for every canonical numeral, filled in once the tables are built
+
+    def __new__(cls, value):
+        if cls is RomanNumber and type(value) is str:
+            number = cls.pool.get(value)
+            if number is not None:
+                return number
+        return super().__new__(cls, value)
+
     ROMAN_NUMERAL_RULES = [
         ("Repeats", "A numeral cannot be repeated more than three times. (IIII is illegal)"),
         ("Subtractives", "Only I, X, and C can be used as subtractives."),
@@ -120,116 +514,1557 @@ class RomanNumber(Number):
         ("UserInputMismatch", "User input does not match code expectations.")
     ]
 
+    ROMAN_TO_DECIMAL = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
+
+    def convert(self):
+        """Converts the Roman numeral to a decimal number"""
+        roman = str(self.value)
+        decimal_value = CONVERSION_TABLE.decimal(roman)
+        if decimal_value is not None:  # Canonical numerals need no rule checks
+            return decimal_value
+        if not METRICS.enabled:
+            return self.validate(roman)
+        with METRICS.timer("validate"):
+            return self.validate(roman)
+
+    def validate(self, roman):
+        """Checks a non-canonical numeral against the rules and raises ValueError describing the violations"""
+        decimal_sum, violated_rules = ROMAN_VALIDATOR.scan(roman)
+        if violated_rules:
+            raise ValueError(
+                f"Invalid Roman numeral: {roman}.  "
+                + ", ".join(text for _, text in ROMAN_VALIDATOR.describe(violated_rules))
+            )
+        return decimal_sum
+
+
+class ExtendedDecimalNumber(DecimalNumber):
+    """Decimal number without the 3999 limit, converted to vinculum notation above it"""
+    __slots__ = ()
+
     def convert(self):
-        roman_to_decimal = {
-            'I': 1, 'IV': 4, 'V': 5, 'IX': 9,
-            'X': 10, 'XL': 40, 'L': 50, 'XC': 90,
-            'C': 100, 'CD': 400, 'D': 500, 'CM': 900, 'M': 1000
-        }
+        """Converts the decimal number to a Roman numeral in vinculum notation"""
+        return ExtendedRomanNumber(VINCULUM.encode(self.value))
+
+
+class ExtendedRomanNumber(RomanNumber):
+    """Roman numeral that may use vinculum notation (an overline multiplies by 1000)"""
+    __slots__ = ()
+
+    def convert(self):
+        """Converts the Roman numeral to a decimal number"""
+        return VINCULUM.decode(str(self.value))
+
+
+class RomanValidator:
+    """
+    ROMAN_NUMERAL_RULES compiled into a transition table.
+
+    A state combines the position in the minimal automaton accepting canonical numerals with the previous
+    numeral and how often it has repeated. Each transition carries the signed value of the previous numeral
+    (negative when it is a subtractive) and the rules broken by the new numeral, so one left-to-right scan
+    with one lookup per character yields both the value and every violated rule.
+    """
+    REPEATS, SUBTRACTIVES, SKIPS, VLD, MISMATCH = (1 << i for i in range(5))  # Bits in ROMAN_NUMERAL_RULES order
+
+    def __init__(self, table):
+        canonical, accepting, canonical_start = self.compile_canonical(table.to_decimal)
+        values = RomanNumber.ROMAN_TO_DECIMAL
+        self.transitions = []  # Per state: {char: (next state, value of the previous char, violated rule bits)}
+        self.last_values = []  # Per state: value of the last char, which is always added
+        self.accepting = []  # Per state: whether the chars so far form a canonical numeral
+
+        states = [(canonical_start, None, 0)]
+        state_ids = {states[0]: 0}
+        for position, prev_char, repeat_count in states:  # Newly reached states are appended while iterating
+            transitions = {}
+            for char, value in values.items():
+                next_position = canonical[position].get(char, -1) if position >= 0 else -1
+                violated = 0
+                if char == prev_char:
+                    next_count = min(repeat_count + 1, 4)
+                    if next_count > 3:
+                        violated |= self.REPEATS
+                    if char in 'VLD':
+                        violated |= self.VLD
+                else:
+                    next_count = 1
+
+                signed_prev = 0
+                if prev_char is not None:
+                    prev_value = values[prev_char]
+                    signed_prev = prev_value
+                    if prev_value < value:
+                        signed_prev = -prev_value
+                        if prev_char not in 'IXC':
+                            violated |= self.SUBTRACTIVES
+                        if value > 10 * prev_value:
+                            violated |= self.SKIPS
+
+                next_state = (next_position, char, next_count)
+                if next_state not in state_ids:
+                    state_ids[next_state] = len(states)
+                    states.append(next_state)
+                transitions[char] = (state_ids[next_state], signed_prev, violated)
+
+            self.transitions.append(transitions)
+            self.last_values.append(values[prev_char] if prev_char is not None else 0)
+            self.accepting.append(position in accepting)
+
+    @staticmethod
+    def compile_canonical(numerals):
+        """
+        Builds the minimal automaton accepting exactly the given numerals.
+
+        Returns:
+            tuple: (transitions as one {char: state} dict per state, set of accepting states, start state)
+        """
+        trie = [{}]
+        final = [False]
+        for numeral in numerals:
+            node = 0
+            for char in numeral:
+                if char not in trie[node]:
+                    trie[node][char] = len(trie)
+                    trie.append({})
+                    final.append(False)
+                node = trie[node][char]
+            final[node] = True
+
+        # Children are always created after their parent, so walking backwards merges suffixes bottom-up
+        registry = {}
+        state_of = [0] * len(trie)
+        transitions = []
+        accepting = set()
+        for node in reversed(range(len(trie))):
+            signature = (final[node], tuple(sorted((char, state_of[child]) for char, child in trie[node].items())))
+            if signature not in registry:
+                registry[signature] = len(transitions)
+                transitions.append(dict(signature[1]))
+                if final[node]:
+                    accepting.add(registry[signature])
+            state_of[node] = registry[signature]
+        return transitions, accepting, state_of[0]
+
+    def scan(self, roman):
+        """
+        Computes the value of roman and the rules it breaks in a single pass.
+
+        Returns:
+            tuple: (decimal value, violated rules as bits in ROMAN_NUMERAL_RULES order)
+
+        Raises:
+            KeyError: If roman contains a character that is not a Roman numeral.
+        """
+        transitions = self.transitions
+        state = 0
         decimal_sum = 0
-        prev_value = 0
+        violated = 0
+        try:
+            for char in roman:
+                state, signed_prev, rules = transitions[state][char]
+                decimal_sum += signed_prev
+                violated |= rules
+        except KeyError:
+            # Report the same character as the right-to-left summing did before
+            raise KeyError(next(char for char in reversed(roman) if char not in RomanNumber.ROMAN_TO_DECIMAL))
+        decimal_sum += self.last_values[state]
+
+        if roman and not violated and not self.accepting[state]:
+            violated = self.MISMATCH
+        return decimal_sum, violated
+
+    def describe(self, violated):
+        """Returns the (name, text) pairs of ROMAN_NUMERAL_RULES whose bits are set in violated"""
+        return [rule for i, rule in enumerate(RomanNumber.ROMAN_NUMERAL_RULES) if violated >> i & 1]
+
+
+class IncrementalRomanParser:
+    """
+    Parses a Roman numeral while it is being typed.
+
+    One (validator state, settled sum, violated rule bits) entry is kept per character of the current
+    text, so appending or deleting a character costs one transition lookup, and any other edit only
+    re-parses from the first changed character.
+    """
+
+    def __init__(self, validator):
+        self.validator = validator
+        self.text = ""
+        self.stack = [(0, 0, 0)]  # Entry i describes text[:i]; a None state follows a non-numeral character
+
+    def update(self, text):
+        """
+        Moves the parser to text, keeping the entries of the prefix it shares with the previous text.
 
-        roman = str(self.value)  # Store string version for analysis
-        violated_rules = [False] * len(self.ROMAN_NUMERAL_RULES)  # Initialize rule violation flags
+        Returns:
+            tuple or None: See result.
+        """
+        text = text.upper()
+        previous = self.text
+        if text.startswith(previous):
+            common = len(previous)
+        else:
+            common = 0
+            for char, previous_char in zip(text, previous):
+                if char != previous_char:
+                    break
+                common += 1
+        del self.stack[common + 1:]
+        for char in text[common:]:
+            self.push(char)
+        self.text = text
+        return self.result()
+
+    def push(self, char):
+        state, decimal_sum, violated = self.stack[-1]
+        transition = self.validator.transitions[state].get(char) if state is not None else None
+        if transition is None:
+            self.stack.append((None, decimal_sum, violated))
+        else:
+            next_state, signed_prev, rules = transition
+            self.stack.append((next_state, decimal_sum + signed_prev, violated | rules))
+
+    def result(self):
+        """
+        Returns:
+            tuple or None: (decimal value, violated rules as RomanValidator bits) of the current text,
+            the same as RomanValidator.scan, or None if the text contains a non-numeral character.
+        """
+        state, decimal_sum, violated = self.stack[-1]
+        if state is None:
+            return None
+        if self.text and not violated and not self.validator.accepting[state]:
+            violated = RomanValidator.MISMATCH
+        return decimal_sum + self.validator.last_values[state], violated
+
+
+class RomanByteParser:
+    """
+    Parses newline-separated Roman numerals straight from a bytes-like buffer, such as a memory-mapped file.
+
+    The validator's transitions are flattened into one 256-entry row per state, indexed by byte, with case
+    folding compiled in and every rule violation or non-numeral byte leading to a dead state. Each state also
+    gets a twin that only accepts the whitespace trailing a numeral, so parsing a record, surrounding
+    whitespace included, is one list lookup per byte with no str, bytes or dict in between.
+    """
+    SPACE = b" \t\n\v\f\r\x1c\x1d\x1e\x1f"  # ASCII bytes that str.strip removes
+
+    def __init__(self, validator, fold_case=True):
+        """
+        Args:
+            validator (RomanValidator): Transition table to compile.
+            fold_case (bool): Read lower case numerals like upper case ones; otherwise they are not numerals.
+        """
+        self.fold = bytes.maketrans(b"ivxlcdm", b"IVXLCDM") if fold_case else bytes(range(256))
+        self.space = bytes(byte in self.SPACE for byte in range(256))
+        states = len(validator.transitions)
+        dead = 2 * states << 8
+        self.table = []  # Row of (next row, value of the previous numeral) entries per state, rows 256 apart
+        for state, transitions in enumerate(validator.transitions):
+            trailing = (states + state) << 8 if state else 0  # Leading whitespace keeps the start state
+            for byte in range(256):
+                transition = transitions.get(chr(self.fold[byte]))
+                if self.space[byte]:
+                    self.table.append((trailing, 0))
+                elif transition is None or transition[2]:
+                    self.table.append((dead, 0))
+                else:
+                    self.table.append((transition[0] << 8, transition[1]))
+        for state in range(states):
+            self.table.extend([(dead, 0) if not is_space else ((states + state) << 8, 0) for is_space in self.space])
+        self.table.extend([(dead, 0)] * 256)
+        # Value of the last numeral per row start, for states (and their twins) that end a canonical numeral
+        self.final = [0] * (dead + 1)
+        for state, last_value in enumerate(validator.last_values):
+            if validator.accepting[state]:
+                self.final[state << 8] = self.final[(states + state) << 8] = last_value
+
+    def parse_into(self, buffer, values, starts, position=0):
+        """
+        Parses records from byte position on until values is full or the buffer ends.
+
+        Record i is stored as values[i], which is 0 if it is not a canonical numeral (surrounding ASCII
+        whitespace is ignored); it spans buffer[starts[i]:starts[i + 1]], including its line ending.
+        Records are split at \n only, so one holding a lone \r, which text mode reads as several lines,
+        is also stored as 0 and left to the caller (see BulkConverter.record_lines).
+
+        Args:
+            buffer: bytes, bytearray or mmap to read.
+            values (array): Preallocated array receiving the decimal values.
+            starts (array): Preallocated array one longer than values receiving the record offsets.
+            position (int): Byte offset of the first record.
+
+        Returns:
+            tuple: (number of records parsed, offset of the next record)
+        """
+        table = self.table
+        final = self.final
+        find = buffer.find
+        size = len(buffer)
+        limit = len(values)
+        count = 0
+        with memoryview(buffer) as view:
+            while count < limit and position < size:
+                end = find(b"\n", position)
+                if end == -1:
+                    end = size
+                row = 0
+                decimal_sum = 0
+                for byte in view[position:end]:
+                    row, signed_prev = table[row + byte]
+                    decimal_sum += signed_prev
+                last_value = final[row]
+                # A \r anywhere but just before the line end would be read as a line break in text mode
+                if last_value and find(b"\r", position, end - 1) == -1:
+                    values[count] = decimal_sum + last_value
+                else:
+                    values[count] = 0
+                starts[count] = position
+                count += 1
+                position = end + 1
+        starts[count] = min(position, size)
+        return count, position
+
+
+class VinculumCodec:
+    """
+    Roman numerals of any size in vinculum notation.
+
+    Every character is followed by one combining overline (U+0305) per factor of 1000, so the value is
+    split into groups of three decimal digits and each group is written with the standard table.
+    Values up to 3999 keep their standard form. Both directions cost one table lookup per digit group.
+    """
+    OVERLINE = "\u0305"
+
+    def __init__(self, table, validator):
+        self.table = table
+        self.validator = validator
+        self.group_tables = []  # Per overline count, the written form of every group value 0-999
+
+    def group_table(self, overlines):
+        while len(self.group_tables) <= overlines:
+            marks = self.OVERLINE * len(self.group_tables)
+            self.group_tables.append([''.join(char + marks for char in self.table.to_roman[group])
+                                      for group in range(1000)])
+        return self.group_tables[overlines]
+
+    def encode(self, value):
+        """Returns the canonical vinculum numeral for a positive integer"""
+        if value < 1:
+            raise InvalidDecimalError(f"Decimal value {value} is outside the supported range (1 or more).")
+        if value <= self.table.maximum:
+            return self.table.to_roman[value]
+        digits = str(value)
+        groups = []
+        for overlines, end in enumerate(range(len(digits), 0, -3)):
+            groups.append(self.group_table(overlines)[int(digits[max(end - 3, 0):end])])
+        return ''.join(reversed(groups))
+
+    def decode(self, roman):
+        """
+        Returns the value of a vinculum numeral.
 
-        for char in roman[::-1]:
-            value = roman_to_decimal[char]
-            if value < prev_value:
-                decimal_sum -= value
+        Raises:
+            ValueError: If a digit group breaks ROMAN_NUMERAL_RULES, or the groups are not in canonical form.
+            KeyError: If roman contains a character that is not a Roman numeral.
+        """
+        # Split into runs of characters carrying the same number of overlines
+        groups = []
+        i = 0
+        while i < len(roman):
+            char = roman[i]
+            i += 1
+            overlines = 0
+            while i < len(roman) and roman[i] == self.OVERLINE:
+                overlines += 1
+                i += 1
+            if groups and groups[-1][0] == overlines:
+                groups[-1][1].append(char)
             else:
-                decimal_sum += value
-            prev_value = value
+                groups.append((overlines, [char]))
 
-        # Rule violation checks
-        last_char = None
-        repeat_count = 0
+        decimal_sum = 0
+        previous_overlines = None
+        for overlines, chars in groups:
+            letters = ''.join(chars)
+            group_value = self.table.decimal(letters)
+            if group_value is None:
+                group_value, violated_rules = self.validator.scan(letters)
+                if violated_rules:
+                    self.raise_invalid(roman, violated_rules)
+            # Groups must get fewer overlines left to right, and only a lone standard numeral may reach 1000
+            standard = len(groups) == 1 and overlines == 0
+            if previous_overlines is not None and overlines >= previous_overlines or \
+                    group_value >= 1000 and not standard:
+                self.raise_invalid(roman, RomanValidator.MISMATCH)
+            previous_overlines = overlines
+            decimal_sum += group_value * 1000 ** overlines
+
+        if decimal_sum < 1:
+            raise RomanNumeralOutOfRangeError(f"Roman numeral {roman} represents"
+                                              f" a value outside the supported range (1 or more).")
+        return decimal_sum
+
+    def raise_invalid(self, roman, violated_rules):
+        raise ValueError(f"Invalid Roman numeral: {roman}.  "
+                         + ", ".join(text for _, text in self.validator.describe(violated_rules)))
+
+
+class NumeralCodec:
+    """
+    Base class for the numeral formats NumberFactory understands.
+
+    A codec claims the characters of its alphabet for detection and parses inputs written in its format.
+    """
+    name = None
+    description = None
+    alphabet = ""  # Characters that select this codec when they end an input
+
+    def parse(self, value):
+        """
+        Returns:
+            ConversionResult or None: The result for value, or None if value is not written in this format.
+        """
+        raise NotImplementedError("parse method must be implemented in subclasses")
 
-        for i, char in enumerate(roman):
-            value = roman_to_decimal[char]
 
-            if char == last_char:
-                repeat_count += 1
+class DecimalCodec(NumeralCodec):
+    """Plain decimal numbers, 1-3999"""
+    name = "decimal"
+    description = "decimal number"
+    alphabet = "0123456789"
 
-                # Repeats rule
-                if repeat_count > 3:
-                    violated_rules[0] = True
+    def parse(self, value):
+        if not (value.isascii() and value.isdigit()):
+            return None
+        try:
+            decimal_value = int(value)
+        except ValueError:  # More digits than int() converts
+            return NumberFactory.INVALID_INPUT
+        if 0 < decimal_value < 4000:
+            return ConversionResult(DecimalNumber(decimal_value), "decimal_to_roman", 0, None, None)
+        return NumberFactory.INVALID_INPUT  # Decimals outside 1-3999 have always been rejected as invalid input
+
+
+class RomanCodec(NumeralCodec):
+    """Upper case Roman numerals, checked against ROMAN_NUMERAL_RULES"""
+    name = "roman"
+    description = "Roman numeral"
+    alphabet = "IVXLCDM"
+
+    def parse(self, value):
+        if value in RomanNumber.pool:  # Canonical numerals need no rule checks
+            return ConversionResult(RomanNumber.pool[value], "roman_to_decimal", 0, None, None)
+        if not value or value.strip(self.alphabet):
+            return None
+        return NumberFactory.classify_roman(value)
+
+
+class LowercaseRomanCodec(NumeralCodec):
+    """Lower case Roman numerals, with the same rules as upper case ones"""
+    name = "lowercase"
+    description = "lower case Roman numeral"
+    alphabet = "ivxlcdm"
+
+    def __init__(self, table):
+        self.to_number = {roman.lower(): RomanNumber(roman) for roman in table.to_decimal}
+
+    def parse(self, value):
+        number = self.to_number.get(value)
+        if number is not None:
+            return ConversionResult(number, "roman_to_decimal", 0, None, None)
+        if not value or value.strip(self.alphabet):
+            return None
+        return NumberFactory.classify_roman(value)
+
+
+class ApostrophusCodec(NumeralCodec):
+    """
+    Roman numerals writing 500 as IↃ and 1000 as CIↃ (or ↀ), as in early printed books.
+
+    Larger apostrophus forms (IↃↃ for 5000 and up) are outside the supported range.
+    """
+    name = "apostrophus"
+    description = "Roman numeral in apostrophus notation"
+    alphabet = "ↀↁↂↃↄ"
+    LARGE = ("ↃↃ", "ↁ", "ↂ")  # Marks of 5000 and more
+
+    def parse(self, value):
+        roman = value.upper()
+        if roman.strip("IVXLCDMↀↁↂↃ"):
+            return None
+        if any(mark in roman for mark in self.LARGE):
+            return ConversionResult(None, "roman_to_decimal", 0, ValueError,
+                                    f"Roman numeral {value} represents a value outside the supported range (1-3999).")
+        # CIↃ is read before IↃ, so 1000 wins over C followed by 500, as it did in print
+        return NumberFactory.classify_roman(roman.replace("CIↃ", "M").replace("IↃ", "D").replace("ↀ", "M"))
+
+
+class MedievalCodec(NumeralCodec):
+    """
+    Roman numerals as written in medieval accounts: fours and nines may be additive (IIII, VIIII, XXXX, ...)
+    and a final I may be written j (iiij, viij).
+
+    Every such form of 1-3999 is precomputed on first use, so parsing is one dictionary lookup.
+    """
+    name = "medieval"
+    description = "medieval Roman numeral"
+    alphabet = "jJ"
+    # Forms of each digit written with I, V and X, translated to the letters of the other places
+    DIGIT_FORMS = (("",), ("I",), ("II",), ("III",), ("IV", "IIII"),
+                   ("V",), ("VI",), ("VII",), ("VIII",), ("IX", "VIIII"))
 
-            else:
-                repeat_count = 1
-                last_char = char
-
-            # Subtractives rules
-            if i < len(roman) - 1 and value < roman_to_decimal[roman[i + 1]]:
-                if char not in 'IXC':
-                    violated_rules[1] = True
-
-            # Skips rule
-            if i < len(roman) - 1 and value < roman_to_decimal[roman[i + 1]] and \
-                    roman_to_decimal[roman[i + 1]] / value > 10:
-                violated_rules[2] = True
-
-            # VLD rule
-            if char in 'VLD':
-                if repeat_count > 1:
-                    violated_rules[3] = True
-
-        # User input mismatch rule
-        expected_roman = DecimalNumber(decimal_sum).convert()
-        if str(expected_roman) != roman and not any(violated_rules[:4]):
-            violated_rules[4] = True
-
-        if any(violated_rules):
-            violated_rules_text = []
-            for i, rule_violated in enumerate(violated_rules):
-                if rule_violated:
-                    violated_rules_text.append(self.ROMAN_NUMERAL_RULES[i][1])
+    def __init__(self):
+        self.to_decimal = None  # Built by the first parse
+
+    def build(self):
+        """Returns the table of every medieval form of 1-3999, building it on the first call"""
+        if self.to_decimal is not None:
+            return self.to_decimal
+        places = []
+        for one, five, ten in (("C", "D", "M"), ("X", "L", "C"), ("I", "V", "X")):
+            letters = str.maketrans("IVX", one + five + ten)
+            places.append([tuple(form.translate(letters) for form in forms) for forms in self.DIGIT_FORMS])
+
+        to_decimal = {}
+        for value in range(1, 4000):
+            numerals = ["M" * (value // 1000)]
+            for forms, digit in zip(places, (value // 100 % 10, value // 10 % 10, value % 10)):
+                numerals = [numeral + form for numeral in numerals for form in forms[digit]]
+            for numeral in numerals:
+                to_decimal[numeral] = value
+        self.to_decimal = to_decimal  # Assigned once complete, so concurrent first calls at worst build it twice
+        return to_decimal
+
+    def parse(self, value):
+        numeral = value.upper()
+        if numeral.endswith("J"):
+            numeral = numeral[:-1] + "I"
+        decimal_value = self.build().get(numeral)
+        if decimal_value is not None:
+            return ConversionResult(RomanNumber(CONVERSION_TABLE.roman(decimal_value)), "roman_to_decimal", 0,
+                                    None, None)
+        if not numeral or numeral.strip("IVXLCDM"):
+            return None
+        return NumberFactory.classify_roman(numeral)
+
+
+class CodecRegistry:
+    """
+    Numeral codecs by name, with detection by character class.
+
+    ASCII input is claimed by the codec whose alphabet holds its last character (a digit, an upper or
+    lower case numeral, or the j ending a medieval numeral), and only one codec reads characters outside
+    ASCII. Detecting a codec therefore costs one flag check and one dictionary lookup, whatever the input.
+    """
+
+    def __init__(self, codecs):
+        self.codecs = {}
+        self.by_last = {}
+        self.non_ascii = None
+        for codec in codecs:
+            self.register(codec)
+
+    def register(self, codec):
+        self.codecs[codec.name] = codec
+        for char in codec.alphabet:
+            self.by_last[char] = codec
+        if not codec.alphabet.isascii():
+            self.non_ascii = codec
+
+    def get(self, name):
+        """
+        Raises:
+            ValueError: If no codec is registered under name.
+        """
+        try:
+            return self.codecs[name]
+        except KeyError:
+            raise ValueError(f"Unknown numeral codec: {name}. Choose one of {', '.join(self.codecs)}.") from None
+
+    def detect(self, value):
+        """Returns the codec for value's character class, or None for input no codec claims"""
+        if not value.isascii():
+            return self.non_ascii
+        return self.by_last.get(value[-1:])
+
+
+CONVERSION_TABLE = ConversionTable()
+ROMAN_VALIDATOR = RomanValidator(CONVERSION_TABLE)
+VINCULUM = VinculumCodec(CONVERSION_TABLE, ROMAN_VALIDATOR)
+DecimalNumber.pool = tuple([None] + [Number.__new__(DecimalNumber, value) for value in range(1, 4000)])
+RomanNumber.pool = {roman: Number.__new__(RomanNumber, roman) for roman in CONVERSION_TABLE.to_decimal}
+# Results of the inputs that need no rule checks: decimals and canonical numerals in either case
+NumberFactory.canonical = {str(value): ConversionResult(number, "decimal_to_roman", 0, None, None)
+                           for value, number in enumerate(DecimalNumber.pool) if number is not None}
+for roman, number in RomanNumber.pool.items():
+    NumberFactory.canonical[roman] = NumberFactory.canonical[roman.lower()] = \
+        ConversionResult(number, "roman_to_decimal", 0, None, None)
+NUMERAL_CODECS = CodecRegistry([DecimalCodec(), RomanCodec(), LowercaseRomanCodec(CONVERSION_TABLE),
+                                ApostrophusCodec(), MedievalCodec()])
+
+
+class RomanIndex:
+    """
+    Sorted collection of Roman numerals for ordering and range queries.
+
+    Numerals are converted once on insertion and kept as sorted integers in an array('H'),
+    so queries compare two-byte keys instead of converting again.
+    """
+
+    def __init__(self, numerals=()):
+        self.keys = array("H")
+        self.update(numerals)
 
-            raise ValueError(
-                f"Invalid Roman numeral: {roman}.  "
-                + ", ".join(violated_rules_text)
-            )
-        else:
-            return decimal_sum
+    @staticmethod
+    def key(numeral):
+        """Returns the value of numeral, raising ValueError if it is not a valid Roman numeral"""
+        if isinstance(numeral, RomanNumber):
+            numeral = numeral.value
+        decimal_value = CONVERSION_TABLE.decimal(numeral)
+        if decimal_value is None:
+            number = NumberFactory.create_number(numeral)
+            if not isinstance(number, RomanNumber):
+                raise ValueError(f"{numeral} is not a Roman numeral.")
+            decimal_value = number.convert()
+        return decimal_value
+
+    def add(self, numeral):
+        """Inserts one numeral at its sorted position"""
+        decimal_value = self.key(numeral)
+        self.keys.insert(bisect.bisect_right(self.keys, decimal_value), decimal_value)
+
+    def update(self, numerals):
+        """Inserts many numerals with one sort instead of one insertion each"""
+        new_keys = [self.key(numeral) for numeral in numerals]
+        if new_keys:
+            new_keys.extend(self.keys)
+            new_keys.sort()
+            self.keys = array("H", new_keys)
+
+    def remove(self, numeral):
+        """Removes one occurrence of numeral, raising ValueError if it is not in the index"""
+        decimal_value = self.key(numeral)
+        position = bisect.bisect_left(self.keys, decimal_value)
+        if position == len(self.keys) or self.keys[position] != decimal_value:
+            raise ValueError(f"{numeral} is not in the index.")
+        del self.keys[position]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, numeral):
+        try:
+            decimal_value = self.key(numeral)
+        except ValueError:
+            return False
+        position = bisect.bisect_left(self.keys, decimal_value)
+        return position < len(self.keys) and self.keys[position] == decimal_value
+
+    def __iter__(self):
+        """Yields the numerals in ascending order"""
+        to_roman = CONVERSION_TABLE.to_roman
+        for decimal_value in self.keys:
+            yield to_roman[decimal_value]
+
+    def bounds(self, low, high):
+        """Returns the slice positions of the keys between low and high inclusive"""
+        low_position = 0 if low is None else bisect.bisect_left(self.keys, self.key(low))
+        high_position = len(self.keys) if high is None else bisect.bisect_right(self.keys, self.key(high))
+        return low_position, max(low_position, high_position)
+
+    def range(self, low=None, high=None):
+        """Yields the numerals between low and high inclusive in ascending order; None leaves a side open"""
+        to_roman = CONVERSION_TABLE.to_roman
+        low_position, high_position = self.bounds(low, high)
+        for position in range(low_position, high_position):
+            yield to_roman[self.keys[position]]
+
+    def count(self, low=None, high=None):
+        """Returns how many numerals lie between low and high inclusive"""
+        low_position, high_position = self.bounds(low, high)
+        return high_position - low_position
+
+    def rank(self, numeral):
+        """Returns how many numerals in the index are smaller than numeral"""
+        return bisect.bisect_left(self.keys, self.key(numeral))
+
+    def __getitem__(self, position):
+        """Returns the numeral at a sorted position"""
+        return CONVERSION_TABLE.to_roman[self.keys[position]]
 
 
 class NumberConverter:
     """Class responsible for converting numbers"""
+    PLACES = (1000, 100, 10, 1)
 
     def convert(self, number):
         """Converts the given number to its corresponding representation"""
-        return number.convert()
+        if not METRICS.enabled:
+            return number.convert()
+        with METRICS.timer("convert"):
+            return number.convert()
 
+    def convert_many(self, values):
+        """
+        Converts a whole column of values in vectorized NumPy passes.
 
-class DataLogger(metaclass=Singleton):
-    """Class responsible for logging data to files"""
+        Args:
+            values (numpy.ndarray or sequence): Integers to convert to Roman numerals,
+                or Roman numeral strings to convert to integers.
 
-    def __init__(self, log_file="history.txt", data_file="data.txt"):
-        self.log_file = log_file
-        self.data_file = data_file
-        self.validate_and_initialize_datafile()
+        Returns:
+            tuple: (results, errors) arrays with the shape of values. errors is a boolean mask
+            of inputs that are invalid or outside the supported range (1-3999); their result is '' or 0.
 
-    def validate_and_initialize_datafile(self):
-        """Checks if data.txt has the required structure. Initializes if needed."""
+        Raises:
+            ImportError: If NumPy is not installed.
+            TypeError: If values are neither integers nor strings.
+        """
+        try:
+            import numpy as np  # Imported here so that loading this module does not pay for NumPy
+        except ImportError:
+            raise ImportError("NumberConverter.convert_many requires NumPy.") from None
+        array = np.asarray(values)
+        if array.dtype.kind in "iu":
+            return self._decimals_to_romans(array)
+        if array.dtype.kind in "USO":
+            return self._romans_to_decimals(array.astype(str))
+        if array.size == 0:
+            return np.zeros(array.shape, dtype="<U15"), np.zeros(array.shape, dtype=bool)
+        raise TypeError(f"convert_many expects integers or Roman numeral strings, got {array.dtype}.")
+
+    def _decimals_to_romans(self, decimals):
+        """Builds Roman numerals by looking up each decimal digit in its place table"""
+        import numpy as np
+        decimals = decimals.astype(np.int64)
+        errors = (decimals < 1) | (decimals > 3999)
+        decimals = np.where(errors, 0, decimals)
+        romans = np.zeros(decimals.shape, dtype="<U15")
+        for place in self.PLACES:
+            place_table = np.array([ConversionTable.build_roman(digit * place) for digit in range(10)])
+            romans = np.char.add(romans, place_table[(decimals // place) % 10])
+        return romans.astype("<U15"), errors
+
+    def _romans_to_decimals(self, romans):
+        """Sums character values with the subtractive sign rule over a padded 2D code-point array"""
+        import numpy as np
+        shape = romans.shape
+        romans = np.ascontiguousarray(np.char.upper(romans.ravel()))
+        width = max(romans.dtype.itemsize // 4, 1)
+        romans = romans.astype(f"<U{width}")
+        codes = romans.view(np.uint32).reshape(romans.size, width)  # Shorter strings are padded with 0
+
+        char_values = np.full(128, -1, dtype=np.int64)
+        char_values[0] = 0  # Padding
+        for char, value in RomanNumber.ROMAN_TO_DECIMAL.items():
+            char_values[ord(char)] = value
+        digits = np.where(codes < 128, char_values[np.minimum(codes, 127)], -1)
+        errors = (digits < 0).any(axis=1)
+        digits = np.maximum(digits, 0)
+
+        next_digits = np.zeros_like(digits)
+        next_digits[:, :-1] = digits[:, 1:]
+        decimals = np.where(digits < next_digits, -digits, digits).sum(axis=1)
+
+        # Only canonical numerals are valid, so re-encode the sums and compare
+        canonical, out_of_range = self._decimals_to_romans(decimals)
+        errors |= out_of_range | (canonical != romans)
+        decimals = np.where(errors, 0, decimals)
+        return decimals.reshape(shape), errors.reshape(shape)
+
+
+class CounterStore:
+    """Abstract base class for the file holding the four usage statistics"""
+    LABELS = (
+        "Number of times code was initiated",
+        "Number of requests",
+        "Number of Roman to decimal conversions",
+        "Number of decimal to Roman conversions"
+    )
+
+    def __init__(self, path):
+        self.path = path
+
+    def validate_and_initialize(self):
+        """Checks that the file has the required structure. Initializes it if needed."""
+        raise NotImplementedError("validate_and_initialize method must be implemented in subclasses")
+
+    def initialize(self):
+        """Sets every statistic to zero"""
+        raise NotImplementedError("initialize method must be implemented in subclasses")
+
+    def read(self):
+        """Returns the four statistics as a list of integers"""
+        raise NotImplementedError("read method must be implemented in subclasses")
+
+    def increment(self, increments):
+        """Adds the four increments to the stored statistics"""
+        raise NotImplementedError("increment method must be implemented in subclasses")
+
+    def format(self):
+        """Renders the statistics as text"""
+        return self.format_counts(self.read())
+
+    def format_counts(self, counts):
+        """Renders counts as one 'label: count' line per statistic"""
+        return "".join(f"{label}: {count}\n" for label, count in zip(self.LABELS, counts))
+
+
+class TextCounterStore(CounterStore):
+    """Statistics kept as human-readable lines in a text file (data.txt)"""
+
+    def validate_and_initialize(self):
         try:
-            with open(self.data_file, "r") as data_file:
+            with open(self.path, "r") as data_file:
                 lines = data_file.readlines()
         except FileNotFoundError:
-            self.initialize_datafile()
+            self.initialize()
             return
 
         if len(lines) != 4:
-            self.initialize_datafile()
+            self.initialize()
+
+    def initialize(self):
+        self.write([0, 0, 0, 0])
+
+    def read(self):
+        with open(self.path, "r") as data_file:
+            return [int(line.split(":")[1].strip()) for line in data_file.readlines()]
+
+    def write(self, counts):
+        """Overwrites the file with the given statistics"""
+        with open(self.path, "w") as data_file:
+            data_file.write(self.format_counts(counts))
+
+    def increment(self, increments):
+        try:
+            counts = self.read()
+        except FileNotFoundError:
+            self.initialize()
+            return
+        self.write([count + increment for count, increment in zip(counts, increments)])
+
+    def format(self):
+        with open(self.path, "r") as data_file:
+            return data_file.read()
+
+
+class BinaryCounterStore(CounterStore):
+    """
+    Statistics kept as fixed-layout unsigned 64-bit integers in a memory-mapped binary file.
+
+    Every access holds an exclusive lock on the file, so several processes can increment
+    the same counters without losing updates.
+    """
+    MAGIC = b"CWSTATS1"
+    LAYOUT = struct.Struct("<8s4Q")
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.thread_lock = threading.Lock()  # File locks do not exclude threads of the same process
+        self.fd = None  # Opened on first access
+        self.memory = None
+
+    @contextmanager
+    def locked(self):
+        """Holds the thread and file locks and makes sure the file has the expected layout"""
+        with self.thread_lock:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_LOCK, self.LAYOUT.size)
+            try:
+                if os.fstat(self.fd).st_size != self.LAYOUT.size:
+                    os.ftruncate(self.fd, self.LAYOUT.size)
+                if self.memory is None:
+                    self.memory = mmap.mmap(self.fd, self.LAYOUT.size)
+                if self.memory[:len(self.MAGIC)] != self.MAGIC:
+                    self.LAYOUT.pack_into(self.memory, 0, self.MAGIC, 0, 0, 0, 0)
+                yield self.memory
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self.fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self.fd, msvcrt.LK_UNLCK, self.LAYOUT.size)
+
+    def validate_and_initialize(self):
+        with self.locked():
+            pass
+
+    def initialize(self):
+        with self.locked() as memory:
+            self.LAYOUT.pack_into(memory, 0, self.MAGIC, 0, 0, 0, 0)
+
+    def read(self):
+        with self.locked() as memory:
+            return list(self.LAYOUT.unpack_from(memory)[1:])
+
+    def increment(self, increments):
+        with self.locked() as memory:
+            counts = self.LAYOUT.unpack_from(memory)[1:]
+            self.LAYOUT.pack_into(memory, 0, self.MAGIC,
+                                  *[count + increment for count, increment in zip(counts, increments)])
+
+    def close(self):
+        """Unmaps and closes the file"""
+        with self.thread_lock:
+            if self.memory is not None:
+                self.memory.close()
+                self.memory = None
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+
+HistoryEntry = namedtuple("HistoryEntry", ["timestamp", "input", "direction", "result", "error_rule", "message"])
+
+
+class HistoryDatabase:
+    """Queryable conversion history stored in an indexed SQLite table"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            input TEXT,
+            direction TEXT,
+            result TEXT,
+            error_rule TEXT,
+            message TEXT
+        );
+        CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);
+        CREATE INDEX IF NOT EXISTS history_direction ON history (direction, timestamp);
+        CREATE INDEX IF NOT EXISTS history_input ON history (input);
+        CREATE INDEX IF NOT EXISTS history_result ON history (result);
+        CREATE INDEX IF NOT EXISTS history_error_rule ON history (error_rule);
+    """
+
+    def __init__(self, path, batch_size=500):
+        """
+        Args:
+            path (str): SQLite database file.
+            batch_size (int): Number of pending events inserted together in one transaction.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.lock = threading.RLock()
+        self.pending = []
+        self.connection = None  # Opened on first use
+
+    def connect(self):
+        """Returns the database connection, opening it and creating the table on first use"""
+        with self.lock:
+            if self.connection is None:
+                import sqlite3  # Not loaded until the database is used
+                self.connection = sqlite3.connect(self.path, check_same_thread=False)
+                self.connection.executescript(self.SCHEMA)
+            return self.connection
+
+    @staticmethod
+    def error_rule(error, rules=0):
+        """
+        Names the violated Roman numeral rules, or the error if no rule applies.
+
+        Args:
+            error (type or Exception): Exception class (or instance) the input was rejected with.
+            rules (int): Violated rule bits, as in ConversionResult.rules.
+        """
+        if rules:
+            return ",".join(name for name, _ in ROMAN_VALIDATOR.describe(rules))
+        return error.__name__ if isinstance(error, type) else error.__class__.__name__
+
+    def add(self, message, user_input=None, direction=None, result=None, error=None, timestamp=None, rules=0):
+        """Queues one event; events are inserted batch_size at a time. See error_rule for error and rules."""
+        if timestamp is None:
+            timestamp = datetime.now()
+        row = (timestamp.isoformat(sep=" "), user_input, direction,
+               None if result is None else str(result),
+               None if error is None else self.error_rule(error, rules), message)
+        with self.lock:
+            self.pending.append(row)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Inserts all pending events in a single transaction"""
+        with self.lock:
+            if not self.pending:
+                return
+            connection = self.connect()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO history (timestamp, input, direction, result, error_rule, message)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", self.pending)
+            self.pending = []
+
+    def query(self, start=None, end=None, direction=None, errors_only=False, value=None):
+        """
+        Yields the matching events as HistoryEntry tuples, oldest first.
+
+        Args:
+            start (datetime): Only events at or after this time.
+            end (datetime): Only events before this time.
+            direction (str): Only "decimal_to_roman" or "roman_to_decimal" events.
+            errors_only (bool): Only events that broke a rule or were otherwise rejected.
+            value (str): Only events whose input or result equals value.
+        """
+        clauses = []
+        parameters = []
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            parameters.append(start.isoformat(sep=" "))
+        if end is not None:
+            clauses.append("timestamp < ?")
+            parameters.append(end.isoformat(sep=" "))
+        if direction is not None:
+            clauses.append("direction = ?")
+            parameters.append(direction)
+        if errors_only:
+            clauses.append("error_rule IS NOT NULL")
+        if value is not None:
+            clauses.append("(input = ? OR result = ?)")
+            parameters.extend([str(value), str(value)])
+
+        sql = "SELECT timestamp, input, direction, result, error_rule, message FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp, id"
+
+        self.flush()
+        with self.lock:
+            rows = self.connect().execute(sql, parameters)
+        for row in rows:
+            yield HistoryEntry(*row)
+
+    def clear(self):
+        """Deletes every stored and pending event"""
+        with self.lock:
+            self.pending = []
+            connection = self.connect()
+            with connection:
+                connection.execute("DELETE FROM history")
+
+    def close(self):
+        """Inserts pending events and closes the database"""
+        with self.lock:
+            self.flush()
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+class CountMinSketch:
+    """
+    Approximate counts of any number of distinct keys in fixed memory.
+
+    A key adds to one counter in each of depth rows and its estimate is the smallest of them, which never
+    undercounts and rarely overcounts by more than a few times total / width.
+    """
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.counts = array("I", bytes(4 * width * depth))
+        self.total = 0
+
+    def indexes(self, key):
+        # A stable hash, so a saved sketch stays valid in later processes; the two halves give every row its own
+        digest = int.from_bytes(hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+        first, second = digest & 0xFFFFFFFF, digest >> 32 | 1
+        width = self.width
+        return [row * width + (first + row * second) % width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        counts = self.counts
+        for index in self.indexes(key):
+            counts[index] += count
+        self.total += count
+
+    def estimate(self, key):
+        counts = self.counts
+        return min(counts[index] for index in self.indexes(key))
+
+    def merge(self, other):
+        """Adds the counts of a sketch of the same width and depth"""
+        self.counts = array("I", [count + other_count for count, other_count in zip(self.counts, other.counts)])
+        self.total += other.total
+
+
+class SpaceSaving:
+    """
+    The most frequent keys of a stream, tracked in fixed memory with the Space-Saving algorithm.
+
+    At most capacity keys are held. A new key replaces the one with the smallest count and inherits
+    that count as its possible overestimate, so every key seen more than total / capacity times is kept.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counters = {}  # Key -> [count, overestimate]
+
+    def add(self, key, count=1):
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+        else:
+            smallest = min(self.counters, key=lambda held: self.counters[held][0])
+            minimum = self.counters.pop(smallest)[0]
+            self.counters[key] = [minimum + count, minimum]
+
+    def merge(self, other):
+        """
+        Adds the keys of another summary, keeping the capacity keys with the highest counts.
+
+        A key missing from a full summary may have been counted there up to that summary's smallest count,
+        which is added to its count and overestimate, as in the mergeable Space-Saving summaries.
+        """
+        floor = self.floor()
+        other_floor = other.floor()
+        merged = {}
+        for key in self.counters.keys() | other.counters.keys():
+            count, overestimate = self.counters.get(key, (floor, floor))
+            other_count, other_overestimate = other.counters.get(key, (other_floor, other_floor))
+            merged[key] = [count + other_count, overestimate + other_overestimate]
+        ranked = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)
+        self.counters = dict(ranked[:self.capacity])
+
+    def floor(self):
+        """Returns the count a key not held may have, 0 until the summary is full"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    def top(self, count=10):
+        """Returns (key, count, overestimate) tuples of the count most frequent keys, most frequent first"""
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, key_count, overestimate) for key, (key_count, overestimate) in ranked[:count]]
+
+
+class TrafficAnalytics:
+    """
+    Summaries of the conversion traffic that stay small however long it runs: per-minute rollups of the
+    statistics, a Count-Min sketch of input frequencies and Space-Saving top lists of inputs and violated rules.
+
+    Nothing of the raw history is kept. Only the changes since the last save are held in memory; at most every
+    SAVE_INTERVAL seconds and on flush they are merged into a compact binary file under a file lock, so several
+    processes can share one file without overwriting each other's traffic.
+    """
+    MAGIC = b"CWTRAF01"
+    HEADER = struct.Struct("<8s3IQ")  # Magic, sketch width and depth, number of rollups, sketch total
+    ROLLUP = struct.Struct("<q4I")  # Minute since the epoch and its counts in COLUMNS order
+    TOP_ENTRY = struct.Struct("<H2Q")  # Key length in bytes, count, overestimate; the key follows
+    COLUMNS = ("requests", "decimal_to_roman", "roman_to_decimal", "error")
+    SAVE_INTERVAL = 5.0
+    MAX_KEY_LENGTH = 100  # Longer inputs are counted by their first characters and their length
+
+    def __init__(self, path, retention=1440, width=2048, depth=4, capacity=100):
+        """
+        Args:
+            path (str): Binary file the summaries are saved to; path + ".lock" is used for locking.
+            retention (int): Minutes of rollups kept.
+            width (int): Counters per Count-Min sketch row.
+            depth (int): Count-Min sketch rows.
+            capacity (int): Keys tracked by each top list.
+        """
+        self.path = path
+        self.retention = retention
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.lock = threading.RLock()
+        self.reset()
+        self.last_save = time.monotonic()
+
+    def reset(self):
+        """Forgets the unsaved changes"""
+        self.rollups = {}  # Minute since the epoch -> counts in COLUMNS order
+        self.sketch = CountMinSketch(self.width, self.depth)
+        self.top_inputs = SpaceSaving(self.capacity)
+        self.top_rules = SpaceSaving(self.capacity)
+        self.dirty = False
+
+    def add_counts(self, counts, timestamp=None):
+        """
+        Adds conversions to the rollup of the current minute.
+
+        Args:
+            counts (dict): Number of requests per conversion type ("decimal_to_roman", "roman_to_decimal" or "error").
+        """
+        minute = int((time.time() if timestamp is None else timestamp) // 60)
+        with self.lock:
+            rollup = self.rollups.get(minute)
+            if rollup is None:
+                rollup = self.rollups[minute] = [0, 0, 0, 0]
+            rollup[0] += sum(counts.values())
+            for i, column in enumerate(self.COLUMNS[1:], start=1):
+                rollup[i] += counts.get(column, 0)
+            self.changed()
+
+    def add_input(self, user_input, error=None, rules=0):
+        """Counts one requested input and, for rejected ones, the rules it broke (see HistoryDatabase.error_rule)"""
+        key = self.key(user_input)
+        with self.lock:
+            self.sketch.add(key)
+            self.top_inputs.add(key)
+            if error is not None:
+                for rule in HistoryDatabase.error_rule(error, rules).split(","):
+                    self.top_rules.add(rule)
+            self.changed()
+
+    @classmethod
+    def key(cls, user_input):
+        """Returns the key user_input is counted under, short enough for any top list entry"""
+        if len(user_input) <= cls.MAX_KEY_LENGTH:
+            return user_input
+        return f"{user_input[:cls.MAX_KEY_LENGTH]}... ({len(user_input)} characters)"
+
+    def changed(self):
+        self.dirty = True
+        if time.monotonic() - self.last_save >= self.SAVE_INTERVAL:
+            self.save()
+
+    def summaries(self):
+        """
+        Returns the saved summaries with the unsaved changes merged in.
+
+        Returns:
+            tuple: (rollups by minute, CountMinSketch, SpaceSaving of inputs, SpaceSaving of violated rules)
+        """
+        with self.lock:
+            with self.file_lock():
+                summaries = self.read()
+            return self.merge_into(*summaries)
+
+    def estimate(self, user_input):
+        """Returns how often user_input was requested, possibly overestimated"""
+        return self.summaries()[1].estimate(self.key(user_input))
+
+    def recent(self, minutes=15, now=None, rollups=None):
+        """Returns (minute start as datetime, counts) pairs of the last minutes that saw traffic, oldest first"""
+        current = int((time.time() if now is None else now) // 60)
+        if rollups is None:
+            rollups = self.summaries()[0]
+        return [(datetime.fromtimestamp(minute * 60), list(rollups[minute]))
+                for minute in sorted(rollups) if minute > current - minutes]
+
+    def report(self, minutes=15, top=10):
+        """Returns the recent rollups and the top lists as text"""
+        rollups, _, top_inputs, top_rules = self.summaries()
+        lines = [f"Traffic of the last {minutes} minutes (requests, decimal to Roman, Roman to decimal, errors):"]
+        lines += [f"  {start:%Y-%m-%d %H:%M}  " + "  ".join(f"{count:>6}" for count in counts)
+                  for start, counts in self.recent(minutes, rollups=rollups)] or ["  none"]
+        for title, top_list in (("Most requested inputs", top_inputs), ("Most violated rules", top_rules)):
+            lines.append(f"{title}:")
+            lines += [f"  {key}: {count}" + (f" (at most {overestimate} too high)" if overestimate else "")
+                      for key, count, overestimate in top_list.top(top)] or ["  none"]
+        return "\n".join(lines)
+
+    @contextmanager
+    def file_lock(self):
+        """Holds an exclusive lock on path + ".lock", so processes read, merge and replace the file in turn"""
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def read(self):
+        """Returns the saved summaries, empty ones if the file is missing or damaged"""
+        empty = ({}, CountMinSketch(self.width, self.depth), SpaceSaving(self.capacity), SpaceSaving(self.capacity))
+        try:
+            with open(self.path, "rb") as analytics_file:
+                data = analytics_file.read()
+        except FileNotFoundError:
+            return empty
+        try:
+            summaries = self.unpack(data)
+        except (ValueError, struct.error, UnicodeDecodeError):
+            return empty
+        sketch = summaries[1]
+        if (sketch.width, sketch.depth) != (self.width, self.depth):
+            if self.sketch.total:  # Sketches of different sizes cannot be merged, the saved one starts over
+                return summaries[0], empty[1], summaries[2], summaries[3]
+            self.width, self.depth = sketch.width, sketch.depth  # Nothing counted yet, so take the saved size
+            self.sketch = CountMinSketch(self.width, self.depth)
+        return summaries
+
+    def merge_into(self, rollups, sketch, top_inputs, top_rules):
+        """Adds the unsaved changes to the given summaries and returns them"""
+        for minute, counts in self.rollups.items():
+            saved = rollups.setdefault(minute, [0, 0, 0, 0])
+            for i, count in enumerate(counts):
+                saved[i] += count
+        if self.sketch.total:
+            sketch.merge(self.sketch)
+        top_inputs.merge(self.top_inputs)
+        top_rules.merge(self.top_rules)
+        return rollups, sketch, top_inputs, top_rules
+
+    def unpack(self, data):
+        magic, width, depth, rollup_count, total = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC:
+            raise ValueError("Not a traffic analytics file.")
+        offset = self.HEADER.size
+        rollups = {}
+        for minute, *counts in self.ROLLUP.iter_unpack(data[offset:offset + rollup_count * self.ROLLUP.size]):
+            rollups[minute] = counts
+        offset += rollup_count * self.ROLLUP.size
+
+        sketch = CountMinSketch(width, depth)
+        size = 4 * width * depth
+        sketch.counts = array("I", data[offset:offset + size])
+        if sys.byteorder == "big":
+            sketch.counts.byteswap()
+        sketch.total = total
+        offset += size
+
+        top_lists = []
+        for _ in range(2):
+            top_list = SpaceSaving(self.capacity)
+            (entries,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            for _ in range(entries):
+                length, count, overestimate = self.TOP_ENTRY.unpack_from(data, offset)
+                offset += self.TOP_ENTRY.size
+                top_list.counters[data[offset:offset + length].decode("utf-8", "surrogatepass")] = [count, overestimate]
+                offset += length
+            top_lists.append(top_list)
+        if len(sketch.counts) != width * depth or offset != len(data):
+            raise ValueError("Truncated traffic analytics file.")
+        return rollups, sketch, top_lists[0], top_lists[1]
+
+    def pack(self, rollups, sketch, top_inputs, top_rules):
+        counts = sketch.counts
+        if sys.byteorder == "big":
+            counts = array("I", counts)
+            counts.byteswap()
+        parts = [self.HEADER.pack(self.MAGIC, sketch.width, sketch.depth, len(rollups), sketch.total)]
+        parts += [self.ROLLUP.pack(minute, *rollups[minute]) for minute in sorted(rollups)]
+        parts.append(counts.tobytes())
+        for top_list in (top_inputs, top_rules):
+            parts.append(struct.pack("<I", len(top_list.counters)))
+            for key, (count, overestimate) in top_list.counters.items():
+                encoded = key.encode("utf-8", "surrogatepass")
+                parts += [self.TOP_ENTRY.pack(len(encoded), count, overestimate), encoded]
+        return b"".join(parts)
+
+    def save(self):
+        """Merges the unsaved changes into the file, dropping rollups older than the retention"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.last_save = time.monotonic()  # After a failure, the next try waits SAVE_INTERVAL as well
+            try:
+                with self.file_lock():
+                    rollups, sketch, top_inputs, top_rules = self.merge_into(*self.read())
+                    oldest = int(time.time() // 60) - self.retention
+                    for minute in [minute for minute in rollups if minute <= oldest]:
+                        del rollups[minute]
+                    temporary_path = self.path + ".tmp"
+                    with open(temporary_path, "wb") as analytics_file:
+                        analytics_file.write(self.pack(rollups, sketch, top_inputs, top_rules))
+                    os.replace(temporary_path, self.path)  # Readers never see a half written file
+            except OSError as e:
+                # The changes stay in memory for the next try; history and statistics must not wait for them
+                print(f"Warning: Could not save traffic analytics to {self.path}: {e}", file=sys.stderr)
+                return
+            self.reset()
+
+    def clear(self):
+        """Forgets all summaries, saved and unsaved"""
+        with self.lock:
+            self.reset()
+            with self.file_lock():
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+
+
+class LineIndex:
+    """Byte offsets of the line starts in a text file, extended incrementally as the file grows"""
+
+    def __init__(self, path, chunk_size=1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        """Forgets every indexed line"""
+        self.offsets = array("q")  # Start of every complete (newline-terminated) line
+        self.next_start = 0  # Start of the line that is still being written
+        self.scanned = 0  # Number of bytes indexed so far
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def refresh(self):
+        """
+        Indexes the lines appended since the last call, starting over if the file was truncated.
+
+        Returns:
+            bool: True if the indexed lines changed.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        truncated = size < self.scanned
+        if truncated:
+            self.reset()
+        if size == self.scanned:
+            return truncated
+
+        lines_before = len(self.offsets)
+        with open(self.path, "rb") as log_file:
+            log_file.seek(self.scanned)
+            while True:
+                chunk = log_file.read(self.chunk_size)
+                if not chunk:
+                    break
+                newline = chunk.find(b"\n")
+                while newline != -1:
+                    self.offsets.append(self.next_start)
+                    self.next_start = self.scanned + newline + 1
+                    newline = chunk.find(b"\n", newline + 1)
+                self.scanned += len(chunk)
+        return truncated or lines_before != len(self.offsets)
+
+    def read_lines(self, first, count):
+        """Returns up to count lines starting at line number first, without their line endings"""
+        first = max(first, 0)
+        last = min(first + count, len(self.offsets))
+        if first >= last:
+            return []
+        end = self.offsets[last] if last < len(self.offsets) else self.next_start
+        with open(self.path, "rb") as log_file:
+            log_file.seek(self.offsets[first])
+            data = log_file.read(end - self.offsets[first])
+        return data.decode("utf-8", errors="replace").splitlines()
+
+
+class DataLogger(metaclass=Singleton):
+    """Class responsible for logging data to files"""
+
+    def __init__(self, log_file="history.txt", data_file="data.txt", buffered=False, counter_file=None,
+                 history_db=None, analytics_file="analytics.bin"):
+        """
+        Args:
+            log_file (str): Text file the history is appended to.
+            data_file (str): Text file holding the statistics.
+            buffered (bool): Start in write-behind buffering mode (see set_buffering).
+            counter_file (str): If given, the statistics are kept in this binary file instead of data_file,
+                which lets several processes update them at once.
+            history_db (str): If given, every event is also stored in this SQLite database for querying.
+            analytics_file (str): File for the per-minute rollups and top inputs (see TrafficAnalytics),
+                None to keep no analytics.
+        """
+        self.log_file = log_file
+        self.data_file = data_file
+        self.counters = BinaryCounterStore(counter_file) if counter_file else TextCounterStore(data_file)
+        self.history_db = HistoryDatabase(history_db) if history_db else None
+        self.analytics = TrafficAnalytics(analytics_file) if analytics_file else None
+        self.lock = threading.RLock()
+        self.pending_lines = []  # History lines not yet written in buffered mode
+        self.pending_counts = [0, 0, 0, 0]  # Statistics increments not yet written in buffered mode
+        self.last_flush = time.monotonic()
+        self.flusher = None  # Thread flushing the buffer once flush_interval has passed, while buffering
+        self.flush_wakeup = threading.Event()
+        self.validated = False  # The statistics file is checked on first use, not at construction
+        self.set_buffering(buffered)
+        atexit.register(self.flush)
+
+    def set_buffering(self, buffered=True, flush_size=1000, flush_interval=5.0):
+        """
+        Switches write-behind buffering on or off.
+
+        Args:
+            buffered (bool): Keep history lines and statistics in memory instead of writing them on every call.
+            flush_size (int): Number of pending history lines that triggers a flush.
+            flush_interval (float): Seconds since the last flush after which buffered entries are written,
+                by the next log call or else by a background thread.
+        """
+        with self.lock:
+            self.buffered = buffered
+            self.flush_size = flush_size
+            self.flush_interval = flush_interval
+            if buffered and self.flusher is None:
+                self.flusher = threading.Thread(target=self.flush_periodically, name="log-flusher", daemon=True)
+                self.flusher.start()
+        self.flush_wakeup.set()  # The flusher picks up the new interval, or stops
+        if not buffered:
+            self.flush()
+
+    def flush_periodically(self):
+        """Flushes entries left in the buffer once flush_interval has passed, until buffering is switched off"""
+        while True:
+            with self.lock:
+                if not self.buffered:
+                    self.flusher = None
+                    return
+                wait = self.flush_interval
+                if self.pending_lines:
+                    wait = self.last_flush + self.flush_interval - time.monotonic()
+            if wait <= 0:
+                self.flush()
+                continue
+            self.flush_wakeup.wait(wait)
+            self.flush_wakeup.clear()
+
+    def validate_and_initialize_datafile(self):
+        """Checks if the statistics file has the required structure. Initializes if needed."""
+        self.counters.validate_and_initialize()
+
+    def ensure_validated(self):
+        """Validates the statistics file once, on the first call that needs it"""
+        if not self.validated:
+            with self.lock:
+                if not self.validated:
+                    self.validate_and_initialize_datafile()
+                    self.validated = True
 
     def initialize_datafile(self):
-        """Creates the data file if it doesn't exist or overwrites with initial data."""
-        with open(self.data_file, "w") as data_file:
-            data_file.write("Number of times code was initiated: 0\n")
-            data_file.write("Number of requests: 0\n")
-            data_file.write("Number of Roman to decimal conversions: 0\n")
-            data_file.write("Number of decimal to Roman conversions: 0\n")
-
-    def log_data(self, log_message, conversion_type=None):
-        """Logs data to files and updates statistics in the data file"""
+        """Creates the statistics file if it doesn't exist or overwrites it with initial data."""
+        self.counters.initialize()
+        self.validated = True
+
+    def format_data(self):
+        """Returns the statistics rendered as text"""
+        self.flush()
+        self.ensure_validated()
+        return self.counters.format()
+
+    @staticmethod
+    def conversion_message(user_input, number, converted_result):
+        """Returns the history line of a conversion, which courseworkReplay.parse_history reads the input back from"""
+        return f"{user_input} is a {number.__class__.__name__}, and its converted value is {converted_result}"
+
+    def log_data(self, log_message, conversion_type=None, user_input=None, result=None, error=None, rules=0):
+        """
+        Logs data to files and updates statistics in the data file.
+
+        user_input, result, error and rules describe the event for the history database and traffic
+        analytics, if configured. error is the exception class of a rejected input (ConversionResult.error)
+        and rules its violated rule bits, so rejections are logged without raising anything.
+        """
         # Handle potential 'None' or empty value for log_message
         if log_message is None:  # Check for None
             # Get the current date and time
@@ -239,64 +2074,388 @@ class DataLogger(metaclass=Singleton):
         elif not log_message:  # Check for empty string
             log_message = "Application started"  # or any other default message
 
-        with open(self.log_file, "a") as history_file:
-            history_file.write(log_message + "\n")
+        self.add_history(log_message, conversion_type, user_input, result, error, rules)
+        self.log_counts(log_message, {conversion_type: 1} if conversion_type else {})
 
-        try:
-            with open(self.data_file, "r") as data_file:
-                lines = data_file.readlines()
-        except FileNotFoundError:
-            self.initialize_datafile()
+    def log_many(self, entries):
+        """
+        Logs several conversions with a single write to the files (or a single buffer update).
+
+        Args:
+            entries (list): (log_message, conversion_type, user_input, result, error, rules) tuples,
+                the arguments of log_data for each conversion.
+        """
+        log_lines = []
+        increments = [0, 0, 0, 0]
+        counts = {}
+        for log_message, conversion_type, user_input, result, error, rules in entries:
+            self.add_history(log_message, conversion_type, user_input, result, error, rules)
+            log_lines.append(log_message)
+            increments[0] += 1
+            if conversion_type:
+                increments[1] += 1
+                increments[2] += conversion_type == "roman_to_decimal"
+                increments[3] += conversion_type == "decimal_to_roman"
+                counts[conversion_type] = counts.get(conversion_type, 0) + 1
+        if not log_lines:
+            return
+        if self.analytics is not None and counts:
+            self.analytics.add_counts(counts)
+        if not self.buffered:
+            with self.lock:  # The files are read and rewritten, one writer at a time
+                self.write_entries(log_lines, increments)
             return
 
-        # Regardless of conversion_type, increment the initiated counter
-        num_times_initiated = int(lines[0].split(":")[1].strip()) + 1
-
-        # Update other statistics based on conversion_type (if provided)
-        num_requests = int(lines[1].split(":")[1].strip())
-        num_roman_to_decimal = int(lines[2].split(":")[1].strip())
-        num_decimal_to_roman = int(lines[3].split(":")[1].strip())
-
-        if conversion_type:
-            num_requests += 1
-            if conversion_type == "roman_to_decimal":
-                num_roman_to_decimal += 1
-            elif conversion_type == "decimal_to_roman":
-                num_decimal_to_roman += 1
-
-        with open(self.data_file, "w") as data_file:
-            data_file.write(f"Number of times code was initiated: {num_times_initiated}\n")
-            data_file.write(f"Number of requests: {num_requests}\n")
-            data_file.write(f"Number of Roman to decimal conversions: {num_roman_to_decimal}\n")
-            data_file.write(f"Number of decimal to Roman conversions: {num_decimal_to_roman}\n")
-
-    def print_history(self):
-        """Prints the contents of the log file (history.txt)."""
+        with self.lock:
+            self.pending_lines.extend(log_lines)
+            for i, increment in enumerate(increments):
+                self.pending_counts[i] += increment
+            flush_due = len(self.pending_lines) >= self.flush_size or \
+                time.monotonic() - self.last_flush >= self.flush_interval
+        if flush_due:
+            self.flush()
+
+    def add_history(self, log_message, conversion_type, user_input, result, error, rules):
+        """Records one event in the history database and its input in the traffic analytics, if configured"""
+        if self.analytics is not None and user_input is not None:
+            self.analytics.add_input(user_input, error, rules)
+        if self.history_db is not None:
+            direction = conversion_type if conversion_type in ("decimal_to_roman", "roman_to_decimal") else None
+            self.history_db.add(log_message, user_input, direction, result, error, rules=rules)
+
+    def log_counts(self, log_message, counts):
+        """
+        Logs one message and adds a whole batch of conversions to the statistics.
+
+        Args:
+            log_message (str): The line to append to the log file.
+            counts (dict): Number of requests per conversion type ("roman_to_decimal",
+                "decimal_to_roman" or "error").
+        """
+        increments = [1, sum(counts.values()), counts.get("roman_to_decimal", 0), counts.get("decimal_to_roman", 0)]
+        if self.analytics is not None and counts:
+            self.analytics.add_counts(counts)
+        if not self.buffered:
+            with self.lock:
+                self.write_entries([log_message], increments)
+            return
+
+        with self.lock:
+            self.pending_lines.append(log_message)
+            for i, increment in enumerate(increments):
+                self.pending_counts[i] += increment
+            flush_due = len(self.pending_lines) >= self.flush_size or \
+                time.monotonic() - self.last_flush >= self.flush_interval
+        if flush_due:
+            self.flush()
+
+    def flush(self):
+        """Writes the history lines and statistics buffered so far in one batch"""
+        with self.lock:
+            if self.pending_lines:
+                self.write_entries(self.pending_lines, self.pending_counts)
+            self.pending_lines = []
+            self.pending_counts = [0, 0, 0, 0]
+            self.last_flush = time.monotonic()
+        if self.history_db is not None:
+            self.history_db.flush()
+        if self.analytics is not None:
+            self.analytics.save()
+
+    def write_entries(self, log_lines, increments):
+        """Appends log_lines to the log file and adds increments to the four statistics"""
+        if METRICS.enabled:
+            with METRICS.timer("log_io"):
+                self.write_files(log_lines, increments)
+        else:
+            self.write_files(log_lines, increments)
+
+    def write_files(self, log_lines, increments):
+        self.ensure_validated()
+        with open(self.log_file, "a") as history_file:
+            history_file.write("".join(line + "\n" for line in log_lines))
+
+        self.counters.increment(increments)
+
+    def query_history(self, **filters):
+        """
+        Yields HistoryEntry tuples from the history database, see HistoryDatabase.query for the filters.
+
+        Raises:
+            RuntimeError: If the logger was created without a history database.
+        """
+        if self.history_db is None:
+            raise RuntimeError("DataLogger was created without a history database.")
+        return self.history_db.query(**filters)
+
+    def format_analytics(self, minutes=15, top=10):
+        """
+        Returns the traffic of the last minutes and the most frequent inputs and rule violations as text.
+
+        Raises:
+            RuntimeError: If the logger was created without analytics.
+        """
+        if self.analytics is None:
+            raise RuntimeError("DataLogger was created without traffic analytics.")
+        return self.analytics.report(minutes, top)
+
+    def print_history(self, tail=None):
+        """Prints the contents of the log file (history.txt), or only its last tail entries."""
+        self.flush()
         try:
-            with open(self.log_file, "r") as history_file:
-                print("\nContents of history.txt:")
-                print(history_file.read())
+            if tail is None:
+                with open(self.log_file, "r") as history_file:
+                    print("\nContents of history.txt:")
+                    print(history_file.read())
+                    print()
+            else:
+                lines = self.tail_history(tail)
+                print(f"\nLast {len(lines)} entries of history.txt:")
+                print("\n".join(lines))
                 print()
         except FileNotFoundError:
             pass
 
+    def tail_history(self, count, block_size=8192):
+        """Returns the last count lines of the log file, reading backwards from its end"""
+        if count <= 0:
+            return []
+        with open(self.log_file, "rb") as history_file:
+            position = history_file.seek(0, os.SEEK_END)
+            data = b""
+            # One newline more than count is needed to know the first returned line is complete
+            while position > 0 and data.count(b"\n") <= count:
+                block = min(block_size, position)
+                position -= block
+                history_file.seek(position)
+                data = history_file.read(block) + data
+        return data.decode("utf-8", errors="replace").splitlines()[-count:]
+
+
+class BulkConverter:
+    """Streams newline-delimited values from one file to another in constant memory"""
+    VALUE_LINES = tuple(f"{value}\n" for value in range(4000))  # Output line per decimal value
+    byte_parsers = {}  # RomanByteParser per fold_case, see byte_parser
+
+    def __init__(self, batch_size=10000, workers=1, extended=False, codec=None):
+        """
+        Args:
+            batch_size (int): Number of lines converted per batch.
+            workers (int): Number of worker processes; 1 converts in this process, 0 uses one per CPU core.
+            extended (bool): Accept values above 3999, using vinculum notation.
+            codec (str): Numeral codec every line is written in, instead of detecting it per line.
+        """
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.extended = extended
+        self.codec = codec
+        self.logger = DataLogger()
+
+    def read_batches(self, input_file):
+        """Yields (first line number, lines) pairs of at most batch_size stripped lines"""
+        batch = []
+        start = 1
+        for line_number, line in enumerate(input_file, start=1):
+            batch.append(line.strip())
+            if len(batch) == self.batch_size:
+                yield start, batch
+                batch = []
+                start = line_number + 1
+        if batch:
+            yield start, batch
+
+    @staticmethod
+    def reject_line(line_number, value, message):
+        """Formats the reject file line of an invalid input line"""
+        if not value.isascii():
+            try:
+                value.encode("utf-8")
+            except UnicodeEncodeError:  # Surrogates stand for the bytes that are not UTF-8
+                message = "Line is not valid UTF-8."
+        return f"{line_number}\t{value}\t{message}\n"
+
+    @staticmethod
+    def convert_batch(start, lines, extended=False, codec=None):
+        """
+        Converts one batch of input lines.
+
+        Returns:
+            tuple: (output lines, reject lines, counts per conversion type). Reject lines hold the
+            input line number, the value and the rule violation message separated by tabs.
+        """
+        converter = NumberConverter()
+        outputs = []
+        rejects = []
+        counts = {"decimal_to_roman": 0, "roman_to_decimal": 0, "error": 0}
+        for line_number, value in enumerate(lines, start=start):
+            result = NumberFactory.parse(value, extended, codec)
+            if result.error is not None:
+                rejects.append(BulkConverter.reject_line(line_number, value, result.message))
+                counts["error"] += 1
+                continue
+            outputs.append(f"{converter.convert(result.number)}\n")
+            counts[result.direction] += 1
+        return outputs, rejects, counts
+
+    def byte_parser(self):
+        """Returns the RomanByteParser matching how parse reads numerals with these settings, or None"""
+        if self.workers != 1 or self.extended or self.codec not in (None, "roman"):
+            return None
+        fold_case = self.codec is None
+        parser = BulkConverter.byte_parsers.get(fold_case)
+        if parser is None:  # Compiled on first use, as most runs never convert a file
+            parser = BulkConverter.byte_parsers[fold_case] = RomanByteParser(ROMAN_VALIDATOR, fold_case)
+        return parser
+
+    @staticmethod
+    def map_lines(input_file):
+        """
+        Maps input_file read-only for RomanByteParser.
+
+        Returns:
+            mmap or None: None if the file is empty.
+        """
+        try:
+            return mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            return None
+
+    @staticmethod
+    def record_lines(record):
+        """
+        Splits a decoded RomanByteParser record into the stripped lines text mode reads from it.
+
+        Text mode ends a line at \n, \r\n or a lone \r, so a record holding a lone \r is several lines.
+        """
+        lines = record.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        if len(lines) > 1 and not lines[-1]:
+            lines.pop()  # Text after the record's own line ending
+        return [line.strip() for line in lines]
+
+    def convert_mapped(self, parser, mapped):
+        """
+        Yields the converted result of every batch of a mapped file, like convert_batches.
+
+        Canonical numerals are parsed from the mapped bytes into a reused array; every other record is decoded,
+        split into lines like text mode would and converted by NumberFactory.parse, so the results are the
+        same as from the text path.
+        """
+        values = array("H", bytes(2 * self.batch_size))
+        starts = array("q", bytes(8 * (self.batch_size + 1)))
+        value_lines = self.VALUE_LINES
+        converter = NumberConverter()
+        position = 0
+        line_number = 1
+        while True:
+            count, position = parser.parse_into(mapped, values, starts, position)
+            if not count:
+                return
+            batch = values if count == len(values) else values[:count]
+            if 0 not in batch:
+                yield list(map(value_lines.__getitem__, batch)), [], {"roman_to_decimal": count}
+                line_number += count
+                continue
+            outputs = []
+            rejects = []
+            counts = {"decimal_to_roman": 0, "roman_to_decimal": 0, "error": 0}
+            for index, decimal_value in enumerate(batch):
+                if decimal_value:
+                    outputs.append(value_lines[decimal_value])
+                    counts["roman_to_decimal"] += 1
+                    line_number += 1
+                    continue
+                record = mapped[starts[index]:starts[index + 1]].decode("utf-8", "surrogateescape")
+                for value in self.record_lines(record):
+                    result = NumberFactory.parse(value, self.extended, self.codec)
+                    if result.error is not None:
+                        rejects.append(self.reject_line(line_number, value, result.message))
+                        counts["error"] += 1
+                    else:
+                        outputs.append(f"{converter.convert(result.number)}\n")
+                        counts[result.direction] += 1
+                    line_number += 1
+            yield outputs, rejects, counts
+
+    def convert_batches(self, batches):
+        """Yields the converted result of every batch, in input order"""
+        if self.workers == 1:
+            for start, lines in batches:
+                yield self.convert_batch(start, lines, self.extended, self.codec)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor  # Only multi-process conversion needs it
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for start, lines in batches:
+                pending.append(executor.submit(self.convert_batch, start, lines, self.extended, self.codec))
+                if len(pending) >= 2 * self.workers:  # Keep every worker busy without reading ahead unboundedly
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def convert_file(self, input_path, output_path, reject_path=None):
+        """
+        Converts every line of input_path, writing results to output_path and invalid lines to reject_path.
+
+        In one process, files of Roman numerals are read through a memory map by RomanByteParser.
+
+        Returns:
+            dict: Number of lines per conversion type ("decimal_to_roman", "roman_to_decimal", "error").
+        """
+        if reject_path is None:
+            reject_path = output_path + ".rejects"
+        totals = {"decimal_to_roman": 0, "roman_to_decimal": 0, "error": 0}
+        # Bytes that are not UTF-8 are kept as surrogates, rejected, and written back unchanged to reject_path
+        with open(input_path, "r", encoding="utf-8", errors="surrogateescape") as input_file, \
+                open(output_path, "w", encoding="utf-8") as output_file, \
+                open(reject_path, "w", encoding="utf-8", errors="surrogateescape") as reject_file:
+            parser = self.byte_parser()
+            mapped = self.map_lines(input_file) if parser is not None else None
+            try:
+                if mapped is not None:
+                    batches = self.convert_mapped(parser, mapped)
+                else:
+                    batches = self.convert_batches(self.read_batches(input_file))
+                for outputs, rejects, counts in batches:
+                    output_file.writelines(outputs)
+                    reject_file.writelines(rejects)
+                    for conversion_type, count in counts.items():
+                        totals[conversion_type] += count
+            finally:
+                if mapped is not None:
+                    mapped.close()
+
+        self.logger.log_counts(f"Bulk conversion of {input_path} to {output_path}:"
+                               f" {totals['decimal_to_roman']} decimal to Roman,"
+                               f" {totals['roman_to_decimal']} Roman to decimal,"
+                               f" {totals['error']} rejected to {reject_path}.", totals)
+        return totals
+
 
 class UserInterface:
-    def __init__(self):
+    def __init__(self, extended=False, history_tail=10, codec=None):
         self.converter = NumberConverter()
         self.logger = DataLogger()
+        self.extended = extended  # Accept values above 3999 in vinculum notation
+        self.codec = codec  # Numeral codec pinned for every input, None detects it
+        self.history_tail = history_tail  # History entries shown at startup
 
     def run(self):
         self.logger.log_data(log_message=None)
-        self.logger.print_history()
+        self.logger.print_history(tail=self.history_tail)
 
         while True:
             user_input = input("Enter a Roman numeral or a decimal number (or 'data' to print data.txt, "
-                               "'logs' to print history.txt, 'clear' to clear logs, 'exit' to quit): ").lower()
+                               "'logs' to print history.txt, 'clear' to clear logs, 'stats' to print latency "
+                               "statistics, 'top' to print traffic analytics, 'exit' to quit): ").lower()
             if user_input == "exit":
                 break
             elif user_input == "data":
                 self.print_data()
+            elif user_input == "stats":
+                self.print_stats()
+            elif user_input == "top":
+                self.print_analytics()
             elif user_input == "clear":
                 self.clear_logs()
             elif user_input == "logs":
@@ -305,33 +2464,65 @@ class UserInterface:
                 self.handle_user_input(user_input)
 
     def clear_logs(self):
-        """Clears the contents of both files and reinitializes data.txt"""
-        for file_path in [self.logger.log_file, self.logger.data_file]:
+        """Clears the contents of both files and reinitializes the statistics"""
+        self.logger.flush()  # Buffered entries belong to the history being cleared
+        for file_path in [self.logger.log_file, self.logger.counters.path]:
             try:
-                open(file_path, 'w').close()
-                print(f"Cleared: {file_path}")
-
-                # Reinitialize data.txt if necessary
-                if file_path == self.logger.data_file:
+                # Statistics are reset in place, other processes may have the file mapped
+                if file_path == self.logger.counters.path:
                     self.logger.initialize_datafile()
+                else:
+                    open(file_path, 'w').close()
+                print(f"Cleared: {file_path}")
 
             except FileNotFoundError:
                 print(f"Warning: File not found: {file_path}")
 
+        if self.logger.history_db is not None:
+            self.logger.history_db.clear()
+            print(f"Cleared: {self.logger.history_db.path}")
+        if self.logger.analytics is not None:
+            self.logger.analytics.clear()
+            self.logger.analytics.save()
+            print(f"Cleared: {self.logger.analytics.path}")
+
     def print_data(self):
-        data_file_path = os.path.join(os.getcwd(), "data.txt")  # Relative to current directory
         try:
-            with open(data_file_path, "r") as data_file:
-                print("\nContents of data.txt:")
-                print(data_file.read())
-                print()
+            data = self.logger.format_data()
+            print(f"\nContents of {self.logger.counters.path}:")
+            print(data)
+            print()
         except FileNotFoundError:
-            print("Error: data.txt not found.")
+            print(f"Error: {self.logger.counters.path} not found.")
+
+    def print_stats(self):
+        cache_info = NumberFactory.cache.info()
+        print(f"\nInput cache: {cache_info['hits']} hits, {cache_info['misses']} misses,"
+              f" {cache_info['evictions']} evictions, {cache_info['size']}/{cache_info['maxsize']} entries")
+        if not METRICS.enabled:
+            print("Latency statistics are disabled. Start with --metrics or --metrics-port to collect them.\n")
+            return
+        print("Latency per stage:")
+        print(METRICS.summary())
+        print()
+
+    def print_analytics(self):
+        if self.logger.analytics is None:
+            print("Traffic analytics are disabled.\n")
+            return
+        print()
+        print(self.logger.format_analytics())
+        print()
 
     def handle_user_input(self, user_input):
         """Handles the user input and performs the conversion"""
+        parsed = NumberFactory.parse(user_input, self.extended, self.codec)
+        if parsed.error is not None:
+            self.logger.log_data(parsed.message, "error", user_input, error=parsed.error, rules=parsed.rules)
+            print(parsed.message)
+            return
         try:
-            number = NumberFactory.create_number(user_input)
+            number = parsed.number
             converted_result = self.converter.convert(number)
 
             conversion_type = "decimal_to_roman" if isinstance(number, DecimalNumber) else "roman_to_decimal"
@@ -342,29 +2533,87 @@ class UserInterface:
                 for rule in violated_rules:
                     rule_violations.append(rule[1])
 
-                log_message = f"{user_input.upper()} is a {number.__class__.__name__}," \
-                              f" and its converted value is {decimal_value}."
+                log_message = DataLogger.conversion_message(user_input.upper(), number, decimal_value) + "."
                 if rule_violations:
                     log_message += " " + " ".join(rule_violations)
 
-                self.logger.log_data(log_message, conversion_type)
+                self.logger.log_data(log_message, conversion_type, user_input, decimal_value)
                 print(log_message)
             else:
-                self.logger.log_data(f"{user_input} is a {number.__class__.__name__},"
-                                     f" and its converted value is {converted_result}", conversion_type)
-                print(f"{user_input} is a {number.__class__.__name__}, and its converted value is {converted_result}")
+                log_message = DataLogger.conversion_message(user_input, number, converted_result)
+                self.logger.log_data(log_message, conversion_type, user_input, converted_result)
+                print(log_message)
 
         except InvalidDecimalError as e:
             error_message = str(e)
-            self.logger.log_data(error_message, "error")
+            self.logger.log_data(error_message, "error", user_input, error=e)
             print(error_message)
         except RomanNumeralOutOfRangeError as e:
-            self.logger.log_data(str(e), "error")
+            self.logger.log_data(str(e), "error", user_input, error=e)
             print(e)
         except ValueError as e:
-            self.logger.log_data(str(e), "error")
+            self.logger.log_data(str(e), "error", user_input, error=e)
             print(e)
 
 
+def main(argv=None):
+    """Command-line entry point: 'convert' for bulk conversion, 'top' for traffic analytics, else the interface"""
+    parser = argparse.ArgumentParser(description="Decimal and Roman number converter")
+    parser.add_argument("--buffered-log", action="store_true",
+                        help="buffer history and statistics in memory and write them in batches")
+    subparsers = parser.add_subparsers(dest="command")
+    convert_parser = subparsers.add_parser("convert", help="convert a newline-delimited file")
+    convert_parser.add_argument("input", help="file with one Roman numeral or decimal number per line")
+    convert_parser.add_argument("output", help="file to write the converted values to")
+    convert_parser.add_argument("--rejects", help="file for invalid lines (default: OUTPUT.rejects)")
+    convert_parser.add_argument("--batch-size", type=int, default=10000, help="lines converted per batch")
+    convert_parser.add_argument("--workers", type=int, default=1,
+                                help="worker processes converting batches in parallel (0: one per CPU core)")
+    top_parser = subparsers.add_parser("top", help="print the traffic rollups and the most frequent inputs")
+    top_parser.add_argument("--minutes", type=int, default=15, help="minutes of rollups to print")
+    top_parser.add_argument("--count", type=int, default=10, help="entries of each top list to print")
+    parser.add_argument("--counter-file",
+                        help="keep statistics in this binary file, safe for several processes at once")
+    parser.add_argument("--history-db", help="also store the history in this SQLite database")
+    parser.add_argument("--analytics-file", default="analytics.bin",
+                        help="file for per-minute rollups and top inputs (empty to disable)")
+    parser.add_argument("--extended", action="store_true",
+                        help="accept values above 3999, writing them in vinculum notation")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="distinct non-canonical inputs whose conversion or error is remembered (0 disables the cache)")
+    parser.add_argument("--metrics", action="store_true", help="record per-stage latency histograms")
+    parser.add_argument("--metrics-port", type=int,
+                        help="record latency histograms and serve them for Prometheus on this local port")
+    parser.add_argument("--codec", choices=list(NUMERAL_CODECS.codecs),
+                        help="read every input in this numeral format instead of detecting it")
+    parser.add_argument("--history-tail", type=int, default=10,
+                        help="history entries shown at startup ('logs' still shows all of them)")
+    args = parser.parse_args(argv)
+    if args.codec and args.extended:
+        parser.error("--codec cannot be combined with --extended")
+    NumberFactory.configure_cache(args.cache_size)
+    if args.metrics_port is not None:
+        METRICS.serve(args.metrics_port)
+    elif args.metrics:
+        METRICS.enable()
+    logger = DataLogger(counter_file=args.counter_file, history_db=args.history_db,
+                        analytics_file=args.analytics_file or None)
+    logger.set_buffering(args.buffered_log)
+
+    if args.command == "top":
+        if logger.analytics is None:
+            parser.error("'top' needs an --analytics-file")
+        print(logger.format_analytics(args.minutes, args.count))
+    elif args.command == "convert":
+        bulk_converter = BulkConverter(args.batch_size, args.workers, args.extended, args.codec)
+        totals = bulk_converter.convert_file(args.input, args.output, args.rejects)
+        print(f"{totals['decimal_to_roman']} decimal to Roman, {totals['roman_to_decimal']} Roman to decimal,"
+              f" {totals['error']} rejected.")
+    else:
+        UserInterface(args.extended, args.history_tail, args.codec).run()
+    return 0
+
+
 # Run the user interface
-#UserInterface().run()
+if __name__ == "__main__":
+    sys.exit(main())
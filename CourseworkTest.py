@@ -1,5 +1,34 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from coursework import *  # Import all classes and functions from coursework.py
+from courseworkBench import compare
+from courseworkGUI import ConversionWorker, preview_text
+from courseworkReplay import InProcessTarget, Replay, parse_history
+from courseworkService import ConversionService
+
+try:
+    import numpy as np
+except ImportError:  # Only the convert_many test needs NumPy
+    np = None
+
+
+def increment_binary_counters(path, times):
+    """Increments a shared binary counter file from a separate process"""
+    store = BinaryCounterStore(path)
+    for _ in range(times):
+        store.increment([1, 1, 0, 1])
+    store.close()
+
 
 class CourseworkTest(unittest.TestCase):
 
@@ -61,6 +90,601 @@ class CourseworkTest(unittest.TestCase):
             num_decimal_to_roman = int(data_file.readlines()[3].split(":")[1].strip())
         self.assertEqual(num_decimal_to_roman, 1)
 
+    def test_conversion_table_round_trip(self):
+        """Every value in the supported range converts to Roman and back through the precomputed tables"""
+        for decimal in range(1, 4000):
+            roman = self.converter.convert(DecimalNumber(decimal))
+            self.assertEqual(self.converter.convert(roman), decimal)
+        self.assertIsNone(CONVERSION_TABLE.decimal("IIII"))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_convert_many(self):
+        """Vectorized conversions agree with the scalar path and flag invalid values"""
+        romans, errors = self.converter.convert_many(np.arange(0, 4001))
+        self.assertEqual(list(errors.nonzero()[0]), [0, 4000])
+        for decimal in range(1, 4000):
+            self.assertEqual(romans[decimal], str(DecimalNumber(decimal).convert()))
+
+        decimals, errors = self.converter.convert_many(['XLIX', 'cdxliv', 'IIII', 'IM', 'MMMM', '', 'X1'])
+        self.assertEqual(list(decimals), [49, 444, 0, 0, 0, 0, 0])
+        self.assertEqual(list(errors), [False, False, True, True, True, True, True])
+
+    def test_bulk_converter(self):
+        """Bulk conversion batches the input lines and separates valid results from rejects"""
+        bulk_converter = BulkConverter(batch_size=2)
+        batches = list(bulk_converter.read_batches(io.StringIO("XIV\n12\nIIII\nmcmxc\n")))
+        self.assertEqual(batches, [(1, ["XIV", "12"]), (3, ["IIII", "mcmxc"])])
+
+        results = list(bulk_converter.convert_batches(batches))
+        self.assertEqual(results[0], (["14\n", "XII\n"], [], {"decimal_to_roman": 1, "roman_to_decimal": 1, "error": 0}))
+        outputs, rejects, counts = results[1]
+        self.assertEqual(outputs, ["1990\n"])
+        self.assertTrue(rejects[0].startswith("3\tIIII\tInvalid Roman numeral: IIII."))
+        self.assertEqual(counts["error"], 1)
+
+    def test_roman_byte_parser(self):
+        """Numerals are parsed from raw bytes into an array, and bulk conversion through a memory map matches"""
+        values = array("H", bytes(2 * 4))
+        starts = array("q", bytes(8 * 5))
+        data = b"XIV\r\n  mcmxc \nIIII\n12\nMMMCMXCIX"
+        parser = BulkConverter().byte_parser()
+        self.assertIs(BulkConverter().byte_parser(), parser)
+        self.assertEqual(parser.parse_into(data, values, starts), (4, 22))
+        self.assertEqual(list(values), [14, 1990, 0, 0])
+        self.assertEqual(data[starts[2]:starts[3]], b"IIII\n")
+        self.assertEqual(parser.parse_into(data, values, starts, 22), (1, 32))
+        self.assertEqual(values[0], 3999)
+        self.assertEqual(BulkConverter(codec="roman").byte_parser().parse_into(b"xiv\nXIV", values, starts), (2, 8))
+        self.assertEqual(list(values[:2]), [0, 14])
+
+        lines = ["XIV", " mcmxc", "IIII", "12", "", "Xiv", "Q"] * 3
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "in.txt")
+            with open(input_path, "w") as input_file:
+                input_file.write("\n".join(lines))
+            bulk_converter = BulkConverter(batch_size=4)
+            with open(input_path, "r") as input_file:
+                mapped = bulk_converter.map_lines(input_file)
+                try:
+                    mapped_results = list(bulk_converter.convert_mapped(parser, mapped))
+                finally:
+                    mapped.close()
+        text_results = list(bulk_converter.convert_batches(bulk_converter.read_batches(io.StringIO("\n".join(lines)))))
+        self.assertEqual([result[:2] for result in mapped_results], [result[:2] for result in text_results])
+
+        # Text mode also ends lines at a lone \r, which the parser leaves to the decoded fallback
+        self.assertEqual(parser.parse_into(b"XIV\r \nXIV\r\n", values, starts), (2, 11))
+        self.assertEqual(list(values[:2]), [0, 14])
+        data = b"XIV\rXV\r\nIIII\r\rX\n\r12\nMMXX\r"
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "in.txt")
+            with open(input_path, "wb") as input_file:
+                input_file.write(data)
+            with open(input_path, "r") as input_file:
+                mapped = bulk_converter.map_lines(input_file)
+                try:
+                    mapped_results = list(bulk_converter.convert_mapped(parser, mapped))
+                finally:
+                    mapped.close()
+            with open(input_path, "r") as input_file:
+                text_results = list(bulk_converter.convert_batches(bulk_converter.read_batches(input_file)))
+        self.assertEqual([line for result in mapped_results for line in result[0]],
+                         [line for result in text_results for line in result[0]])
+        self.assertEqual([line for result in mapped_results for line in result[1]],
+                         [line for result in text_results for line in result[1]])
+
+    def test_bulk_converter_invalid_utf8(self):
+        """Lines that are not UTF-8 are rejected and kept byte for byte, on the mapped and the text path"""
+        class CountLogger:
+            def log_counts(self, message, counts):
+                self.counts = counts
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "in.txt")
+            output_path = os.path.join(directory, "out.txt")
+            with open(input_path, "wb") as input_file:
+                input_file.write(b"XIV\n\xff\xfe\n12\n")
+            for bulk_converter in (BulkConverter(), BulkConverter(extended=True)):
+                bulk_converter.logger = CountLogger()
+                totals = bulk_converter.convert_file(input_path, output_path)
+                self.assertEqual(totals, {"decimal_to_roman": 1, "roman_to_decimal": 1, "error": 1})
+                self.assertEqual(bulk_converter.logger.counts, totals)
+                with open(output_path + ".rejects", "r", encoding="utf-8", errors="surrogateescape") as reject_file:
+                    self.assertEqual(reject_file.read().encode("utf-8", "surrogateescape"),
+                                     b"2\t\xff\xfe\tLine is not valid UTF-8.\n")
+
+    def test_bulk_converter_workers(self):
+        """Parallel bulk conversion returns the same batches in input order"""
+        batches = [(start, [str(value) for value in range(start, start + 50)]) for start in range(1, 1000, 50)]
+        sequential = list(BulkConverter(batch_size=50).convert_batches(batches))
+        parallel = list(BulkConverter(batch_size=50, workers=2).convert_batches(batches))
+        self.assertEqual(parallel, sequential)
+
+    def test_data_logger_buffering(self):
+        """Buffered log entries are written in one batch once flush_size is reached"""
+        def read_history():
+            try:
+                with open(self.logger.log_file, "r") as log_file:
+                    return log_file.read()
+            except FileNotFoundError:
+                return ""
+
+        self.logger.set_buffering(True, flush_size=3, flush_interval=60)
+        try:
+            self.logger.log_data("Buffered message 1")
+            self.logger.log_data("Buffered message 2")
+            self.assertNotIn("Buffered message 1", read_history())
+            self.logger.log_data("Buffered message 3")
+            self.assertIn("Buffered message 1\nBuffered message 2\nBuffered message 3\n", read_history())
+            self.logger.log_data("Buffered message 4")
+            self.logger.flush()
+            self.assertIn("Buffered message 4", read_history())
+        finally:
+            self.logger.set_buffering(False)
+
+    def test_data_logger_periodic_flush(self):
+        """Buffered entries are written once flush_interval has passed, without another log call"""
+        self.logger.set_buffering(True, flush_size=1000, flush_interval=0.1)
+        flusher = self.logger.flusher
+        try:
+            self.logger.flush()  # The next entry is then not due yet when it is logged
+            self.logger.log_data("Buffered message after a burst")
+            self.assertNotIn("Buffered message after a burst", self.logger.tail_history(5))
+            deadline = time.monotonic() + 5
+            while "Buffered message after a burst" not in self.logger.tail_history(5) and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.assertIn("Buffered message after a burst", self.logger.tail_history(5))
+        finally:
+            self.logger.set_buffering(False)
+        flusher.join(5)
+        self.assertFalse(flusher.is_alive())
+
+    def test_data_logger_threads(self):
+        """Logging from several threads at once loses no history line or statistics increment"""
+        self.logger.ensure_validated()
+        before = self.logger.counters.read()
+
+        def log_entries(thread_number):
+            for i in range(200):
+                self.logger.log_data(f"Thread {thread_number} entry {i}", "roman_to_decimal")
+
+        threads = [threading.Thread(target=log_entries, args=(thread_number,)) for thread_number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        after = self.logger.counters.read()
+        self.assertEqual([new - old for new, old in zip(after, before)], [1600, 1600, 1600, 0])
+        self.assertEqual(len([line for line in self.logger.tail_history(1600) if line.startswith("Thread ")]), 1600)
+
+    def test_binary_counter_store(self):
+        """Concurrent increments from several processes are not lost"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.bin")
+            store = BinaryCounterStore(path)
+            store.validate_and_initialize()
+            with ProcessPoolExecutor(max_workers=4) as executor:
+                list(executor.map(increment_binary_counters, [path] * 4, [250] * 4))
+            self.assertEqual(store.read(), [1000, 1000, 0, 1000])
+            self.assertIn("Number of requests: 1000\n", store.format())
+            store.initialize()
+            self.assertEqual(store.read(), [0, 0, 0, 0])
+            store.close()
+
+    def test_history_database(self):
+        """History events can be queried by time range, direction, errors and value"""
+        history_db = HistoryDatabase(":memory:", batch_size=2)
+        history_db.add("Application started", timestamp=datetime(2024, 1, 1, 9))
+        history_db.add("XIV is a RomanNumber", "XIV", "roman_to_decimal", 14, timestamp=datetime(2024, 1, 1, 10))
+        history_db.add("14 is a DecimalNumber", "14", "decimal_to_roman", "XIV", timestamp=datetime(2024, 1, 2))
+        rejected = NumberFactory.parse("IIII")
+        history_db.add(rejected.message, "IIII", error=rejected.error, timestamp=datetime(2024, 1, 3),
+                       rules=rejected.rules)
+        history_db.add("'Q'", "Q", error=ValueError, timestamp=datetime(2024, 1, 4))
+
+        self.assertEqual([entry.input for entry in history_db.query(value="XIV")], ["XIV", "14"])
+        self.assertEqual([entry.input for entry in history_db.query(direction="decimal_to_roman")], ["14"])
+        errors = list(history_db.query(errors_only=True))
+        self.assertEqual([(entry.input, entry.error_rule) for entry in errors],
+                         [("IIII", "Repeats"), ("Q", "ValueError")])
+        in_range = history_db.query(start=datetime(2024, 1, 1, 10), end=datetime(2024, 1, 3))
+        self.assertEqual([entry.result for entry in in_range], ["14", "XIV"])
+        history_db.close()
+
+    def test_line_index(self):
+        """The line index grows with appended lines and starts over when the file is truncated"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history.txt")
+            with open(path, "w") as log_file:
+                log_file.write("first\nsecond\nthird\npartial")
+            index = LineIndex(path, chunk_size=4)
+            self.assertTrue(index.refresh())
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.read_lines(1, 5), ["second", "third"])
+
+            with open(path, "a") as log_file:
+                log_file.write(" line\nfifth\n")
+            self.assertTrue(index.refresh())
+            self.assertFalse(index.refresh())
+            self.assertEqual(index.read_lines(3, 2), ["partial line", "fifth"])
+
+            open(path, "w").close()
+            self.assertTrue(index.refresh())
+            self.assertEqual(len(index), 0)
+
+    def test_conversion_service(self):
+        """The service answers pipelined single and batch requests in order"""
+        async def exchange():
+            service = ConversionService(port=0, log=False)
+            await service.start()
+            reader, writer = await asyncio.open_connection(service.host, service.port)
+            writer.write(b'"XIV"\n[12, "IIII"]\n{"bad": 1}\n')
+            responses = [json.loads(await reader.readline()) for _ in range(3)]
+            writer.close()
+            await service.close()
+            return responses
+
+        single, batch, bad = asyncio.run(exchange())
+        self.assertEqual(single, {"input": "XIV", "result": 14, "direction": "roman_to_decimal"})
+        self.assertEqual(batch[0], {"input": "12", "result": "XII", "direction": "decimal_to_roman"})
+        self.assertTrue(batch[1]["error"].startswith("Invalid Roman numeral: IIII."))
+        self.assertIn("error", bad)
+
+    def test_conversion_service_log_backpressure(self):
+        """Responses wait once max_log_pending batches are queued for a slow logger"""
+        class BlockingLogger:
+            def __init__(self):
+                self.release = threading.Event()
+                self.batches = 0
+
+            def log_many(self, entries):
+                self.release.wait(5)
+                self.batches += 1
+
+        async def exchange():
+            service = ConversionService(log=False, max_log_pending=2)
+            service.logger = logger = BlockingLogger()
+            requests = [asyncio.create_task(service.handle_request(b'"XIV"\n')) for _ in range(4)]
+            await asyncio.sleep(0.1)
+            waiting = sum(not request.done() for request in requests)
+            logger.release.set()
+            await asyncio.gather(*requests)
+            service.log_executor.shutdown(wait=True)
+            return waiting, logger.batches
+
+        self.assertEqual(asyncio.run(exchange()), (2, 4))
+
+    def test_benchmark_compare(self):
+        """Benchmark results slower than the baseline by more than the threshold are flagged"""
+        baseline = {"convert": {"ops_per_sec": 1000, "p50_ns": 100}}
+        self.assertEqual(compare({"convert": {"ops_per_sec": 950, "p50_ns": 105}}, baseline, 0.10), [])
+        regressions = compare({"convert": {"ops_per_sec": 800, "p50_ns": 130}, "new": {}}, baseline, 0.10)
+        self.assertEqual(len(regressions), 2)
+
+    def test_stage_metrics(self):
+        """Enabled metrics record every stage and export them in the Prometheus format"""
+        metrics = Metrics()
+        metrics.enable()
+        for seconds in (0.000001, 0.000002, 0.000003, 0.5):
+            metrics.observe("convert", seconds)
+        histogram = metrics.histograms["convert"]
+        self.assertEqual(histogram.count, 4)
+        self.assertLess(histogram.percentile(50), 0.00001)
+        self.assertGreater(histogram.percentile(99), 0.25)
+
+        exported = metrics.prometheus()
+        self.assertIn('coursework_stage_duration_seconds_count{stage="convert"} 4', exported)
+        self.assertIn('coursework_stage_duration_seconds_bucket{stage="convert",le="+Inf"} 4', exported)
+
+        METRICS.enable()
+        NumberFactory.cache.clear()
+        try:
+            self.converter.convert(NumberFactory.create_number("0014"))
+            with self.assertRaises(ValueError):
+                RomanNumber("IIII").convert()
+        finally:
+            METRICS.enable(False)
+        for stage in ("classify", "validate", "convert"):
+            self.assertGreater(METRICS.histograms[stage].count, 0)
+
+    def test_roman_validator(self):
+        """The compiled validator reports the value and every violated rule in one scan"""
+        self.assertEqual(ROMAN_VALIDATOR.scan("MCMXC"), (1990, 0))
+        self.assertEqual(ROMAN_VALIDATOR.scan("IIII"), (4, RomanValidator.REPEATS))
+        self.assertEqual(ROMAN_VALIDATOR.scan("VVX"), (10, RomanValidator.SUBTRACTIVES | RomanValidator.VLD))
+        self.assertEqual(ROMAN_VALIDATOR.scan("IM"), (999, RomanValidator.SKIPS))
+        self.assertEqual(ROMAN_VALIDATOR.scan("IXIX"), (18, RomanValidator.MISMATCH))
+        with self.assertRaisesRegex(ValueError, r"^Invalid Roman numeral: IIII\.  A numeral cannot be repeated"):
+            RomanNumber("IIII").convert()
+
+    def test_number_factory_cache(self):
+        """create_number caches non-canonical input only and evicts the least recently used input"""
+        NumberFactory.configure_cache(2)
+        NumberFactory.cache.clear()
+        try:
+            self.assertIs(NumberFactory.create_number("XIV"), RomanNumber("XIV"))
+            self.assertIs(NumberFactory.create_number("xiv"), RomanNumber("XIV"))
+            self.assertIs(NumberFactory.create_number("12"), DecimalNumber(12))
+            self.assertEqual(NumberFactory.cache.info()["misses"], 0)
+            first = NumberFactory.create_number("0012")
+            self.assertIs(NumberFactory.create_number("0012"), first)
+            for _ in range(2):
+                with self.assertRaisesRegex(ValueError, "^Invalid Roman numeral: IIII"):
+                    NumberFactory.create_number("IIII")
+            NumberFactory.parse("VX")  # Evicts "0012"
+            NumberFactory.create_number("0012")  # Miss, evicts "IIII"
+            self.assertEqual(NumberFactory.cache.info(),
+                             {"hits": 2, "misses": 4, "evictions": 2, "size": 2, "maxsize": 2})
+        finally:
+            NumberFactory.configure_cache(1024)
+
+    def test_shared_immutable_numbers(self):
+        """Numbers in the supported range are shared instances that cannot be modified"""
+        self.assertIs(DecimalNumber(444), DecimalNumber(444))
+        self.assertIs(self.converter.convert(DecimalNumber(444)), RomanNumber("CDXLIV"))
+        self.assertIs(NumberFactory.create_number("cdxliv"), RomanNumber("CDXLIV"))
+        self.assertEqual(DecimalNumber(5000), DecimalNumber(5000))
+        self.assertFalse(hasattr(DecimalNumber(1), "__dict__"))
+        with self.assertRaises(AttributeError):
+            DecimalNumber(1).value = 2
+
+    def test_extended_vinculum_conversion(self):
+        """Extended mode converts values above 3999 to vinculum notation and back"""
+        overline = VinculumCodec.OVERLINE
+        test_cases = [(3999, "MMMCMXCIX"), (4000, f"I{overline}V{overline}"),
+                      (1234567, f"I{overline * 2}C{overline}C{overline}X{overline}X{overline}X{overline}"
+                                f"I{overline}V{overline}DLXVII")]
+        for decimal, expected_roman in test_cases:
+            roman = self.converter.convert(NumberFactory.create_number(str(decimal), extended=True))
+            self.assertEqual(str(roman), expected_roman)
+            self.assertEqual(self.converter.convert(NumberFactory.create_number(expected_roman, extended=True)),
+                             decimal)
+
+        with self.assertRaises(ValueError):
+            NumberFactory.create_number("4000")
+        for invalid in [f"M{overline}", f"IV{overline}", f"V{overline}V{overline}", "MMMM"]:
+            with self.assertRaisesRegex(ValueError, "^Invalid Roman numeral"):
+                NumberFactory.create_number(invalid, extended=True)
+
+    def test_roman_index(self):
+        """The index keeps numerals sorted and answers range, count and rank queries"""
+        index = RomanIndex(["MM", "X", "cc", "IV", "XL", "L"])
+        index.add("XLI")
+        self.assertEqual(list(index), ["IV", "X", "XL", "XLI", "L", "CC", "MM"])
+        self.assertEqual(list(index.range("XL", "CC")), ["XL", "XLI", "L", "CC"])
+        self.assertEqual(index.count("XLV", None), 3)
+        self.assertEqual(index.rank("L"), 4)
+        self.assertIn("XLI", index)
+        self.assertNotIn("XLII", index)
+        with self.assertRaises(ValueError):
+            index.add("12")
+        with self.assertRaises(ValueError):
+            index.add("IIII")
+
+    def test_history_tail(self):
+        """Startup reads only the end of the history file, and stores open nothing until first used"""
+        log_file = self.logger.log_file
+        with tempfile.TemporaryDirectory() as directory:
+            self.logger.log_file = os.path.join(directory, "history.txt")
+            try:
+                with open(self.logger.log_file, "w") as history_file:
+                    history_file.writelines(f"entry {number}\n" for number in range(1000))
+                self.assertEqual(self.logger.tail_history(3, block_size=7), ["entry 997", "entry 998", "entry 999"])
+                self.assertEqual(len(self.logger.tail_history(5000)), 1000)
+            finally:
+                self.logger.log_file = log_file
+
+            path = os.path.join(directory, "data.bin")
+            store = BinaryCounterStore(path)
+            self.assertFalse(os.path.exists(path))
+            store.validate_and_initialize()
+            self.assertEqual(store.read(), [0, 0, 0, 0])
+            store.close()
+
+    def test_conversion_worker(self):
+        """The GUI worker converts and logs off the calling thread, in chunks, and stops when cancelled"""
+        class RecordingLogger:
+            def __init__(self):
+                self.entries = []
+
+            def log_many(self, entries):
+                self.entries.append([entry[:3] for entry in entries])
+
+        logger = RecordingLogger()
+        worker = ConversionWorker(NumberConverter(), logger)
+        worker.CHUNK_SIZE = 2
+        worker.start()
+        cancelled = threading.Event()
+        cancelled.set()
+        first = worker.submit(["XIV", "12", "IIII"])
+        second = worker.submit(["I"] * 10, cancelled)
+        worker.stop()
+        worker.join()
+
+        results = []
+        while not worker.results.empty():
+            results.append(worker.results.get())
+        invalid = "Invalid Roman numeral: IIII.  A numeral cannot be repeated more than three times. (IIII is illegal)"
+        self.assertEqual(results, [
+            (first, 0, [("XIV", "14", "XIV is a RomanNumber, and its converted value is 14"),
+                        ("12", "XII", "12 is a DecimalNumber, and its converted value is XII")]),
+            (first, 2, [("IIII", "", invalid)]),
+            (first, None, None),
+            (second, None, None),
+        ])
+        self.assertEqual(logger.entries[1], [(invalid, "error", "IIII")])
+
+    def test_conversion_worker_failures(self):
+        """Conversion and logging failures are reported in the rows and the worker keeps answering"""
+        class FailingLogger:
+            def log_many(self, entries):
+                raise OSError("No space left on device")
+
+        class FailingConverter(NumberConverter):
+            def convert(self, number):
+                if number.__class__.__name__ == "DecimalNumber":
+                    raise RuntimeError("converter failed")
+                return super().convert(number)
+
+        worker = ConversionWorker(FailingConverter(), FailingLogger())
+        worker.start()
+        first = worker.submit(["12", "XIV"])
+        second = worker.submit(["I"])
+        worker.stop()
+        worker.join()
+
+        results = []
+        while not worker.results.empty():
+            results.append(worker.results.get())
+        not_logged = " (not logged: No space left on device)"
+        self.assertEqual(results, [
+            (first, 0, [("12", "", "Error: converter failed" + not_logged),
+                        ("XIV", "14", "XIV is a RomanNumber, and its converted value is 14" + not_logged)]),
+            (first, None, None),
+            (second, 0, [("I", "1", "I is a RomanNumber, and its converted value is 1" + not_logged)]),
+            (second, None, None),
+        ])
+
+    def test_number_factory_parse(self):
+        """parse reports the number, direction and violated rules without raising"""
+        self.assertEqual(NumberFactory.parse("xiv"), (RomanNumber("XIV"), "roman_to_decimal", 0, None, None))
+        self.assertEqual(NumberFactory.parse("14"), (DecimalNumber(14), "decimal_to_roman", 0, None, None))
+        result = NumberFactory.parse("VVX")
+        self.assertFalse(result.ok)
+        self.assertEqual(result.direction, "roman_to_decimal")
+        self.assertEqual(result.rules, RomanValidator.SUBTRACTIVES | RomanValidator.VLD)
+        self.assertEqual(NumberFactory.parse("12A"), NumberFactory.INVALID_INPUT)
+        self.assertEqual(NumberFactory.parse("XQV").message, "'Q'")
+        self.assertIs(NumberFactory.parse("0", extended=True).error, InvalidDecimalError)
+        with self.assertRaisesRegex(ValueError, "^Invalid Roman numeral: VVX\\."):
+            NumberFactory.create_number("VVX")
+
+    def test_overlong_decimal_input(self):
+        """Digit strings longer than int() converts are rejected, not raised, on every conversion path"""
+        digits = "9" * 5000
+        self.assertEqual(NumberFactory.parse(digits), NumberFactory.INVALID_INPUT)
+        self.assertEqual(NumberFactory.parse(digits, codec="decimal"), NumberFactory.INVALID_INPUT)
+        self.assertIs(NumberFactory.parse(digits, extended=True).error, InvalidDecimalError)
+        outputs, rejects, counts = BulkConverter.convert_batch(1, [digits, "12"])
+        self.assertEqual((outputs, counts["error"]), (["XII\n"], 1))
+        response = asyncio.run(ConversionService(log=False).handle_request(json.dumps(digits).encode()))
+        self.assertEqual(json.loads(response)["error"], NumberFactory.INVALID_INPUT.message)
+
+    def test_incremental_roman_parser(self):
+        """Every edit gives the same result as scanning the whole text again"""
+        parser = IncrementalRomanParser(ROMAN_VALIDATOR)
+        for text in ["M", "MC", "MCM", "MCMX", "MCMXC", "MCMXCIV", "MCMX", "MCMXX", "", "ii", "iiii", "XQI", "XI"]:
+            expected = None if "Q" in text else ROMAN_VALIDATOR.scan(text.upper())
+            self.assertEqual(parser.update(text), expected)
+        self.assertEqual(preview_text(" 1990 ", parser), "Preview: MCMXC")
+        self.assertEqual(preview_text("IM", parser), "Preview: breaks Skips")
+        self.assertEqual(preview_text("xiv", parser), "Preview: 14")
+        self.assertEqual(preview_text("0012", parser), "Preview: XII")
+        self.assertEqual(preview_text("000", parser), "Preview: outside the supported range (1-3999)")
+        self.assertEqual(preview_text("9" * 5000, parser), "Preview: outside the supported range (1-3999)")
+        self.assertEqual(preview_text("iiij", parser), "Preview: 4")
+        self.assertEqual(preview_text("XQ", parser), "Preview: not a Roman numeral or decimal number")
+
+    def test_numeral_codecs(self):
+        """Codecs are detected from the input's character class, or pinned by name"""
+        self.assertIs(NUMERAL_CODECS.detect("1990"), NUMERAL_CODECS.get("decimal"))
+        self.assertIs(NUMERAL_CODECS.detect("MCMXC"), NUMERAL_CODECS.get("roman"))
+        self.assertIs(NUMERAL_CODECS.detect("mcmxc"), NUMERAL_CODECS.get("lowercase"))
+        self.assertIs(NUMERAL_CODECS.detect("CIↃCCCXC"), NUMERAL_CODECS.get("apostrophus"))
+        self.assertIs(NUMERAL_CODECS.detect("xiiij"), NUMERAL_CODECS.get("medieval"))
+
+        self.assertEqual(NumberFactory.create_number("CIↃIↃXC").convert(), 1590)
+        self.assertEqual(NumberFactory.create_number("mccccxciiij").convert(), 1494)
+        self.assertEqual(NumberFactory.create_number("LXXXX", codec="medieval").convert(), 90)
+        with self.assertRaisesRegex(ValueError, "^Invalid Roman numeral: LXXXX"):
+            NumberFactory.create_number("LXXXX")
+        with self.assertRaisesRegex(ValueError, "^XIV is not a decimal number"):
+            NumberFactory.create_number("XIV", codec="decimal")
+        with self.assertRaisesRegex(ValueError, "outside the supported range"):
+            NumberFactory.create_number("IↃↃ")
+        with self.assertRaises(ValueError):
+            NUMERAL_CODECS.get("runic")
+
+    def test_traffic_analytics(self):
+        """Rollups and top lists are updated per event and survive a save and reload"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "analytics.bin")
+            analytics = TrafficAnalytics(path, width=64, depth=3, capacity=4)
+            now = time.time() // 60 * 60 + 30  # Rollups older than the retention are dropped on save
+            analytics.add_counts({"roman_to_decimal": 2, "error": 1}, timestamp=now - 60)
+            analytics.add_counts({"decimal_to_roman": 1}, timestamp=now)
+            for value in ["XIV"] * 5 + ["12"] * 3 + ["IIII", "VX", "IC"]:
+                analytics.add_input(value)
+            rejected = NumberFactory.parse("IIII")
+            analytics.add_input("IIII", rejected.error, rejected.rules)
+            analytics.save()
+
+            reloaded = TrafficAnalytics(path, capacity=4)
+            self.assertEqual([counts for _, counts in reloaded.recent(5, now=now)], [[3, 0, 2, 1], [1, 1, 0, 0]])
+            _, _, top_inputs, top_rules = reloaded.summaries()
+            self.assertEqual(top_inputs.top(2), [("XIV", 5, 0), ("12", 3, 0)])
+            self.assertEqual(top_rules.top(), [("Repeats", 1, 0)])
+            self.assertGreaterEqual(reloaded.estimate("IIII"), 2)
+            self.assertEqual(reloaded.estimate("XIV"), 5)
+            self.assertIn("XIV: 5", reloaded.report())
+
+    def test_traffic_analytics_shared_file(self):
+        """Processes sharing one analytics file merge their traffic on save instead of overwriting it"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "analytics.bin")
+            first = TrafficAnalytics(path)
+            second = TrafficAnalytics(path)
+            now = time.time()
+            for analytics, value in ((first, "XIV"), (second, "12"), (first, "XIV")):
+                analytics.add_counts({"roman_to_decimal" if value.isalpha() else "decimal_to_roman": 1}, timestamp=now)
+                analytics.add_input(value)
+                analytics.save()
+            self.assertEqual(second.recent(1, now=now)[0][1], [3, 1, 2, 0])
+            self.assertEqual(TrafficAnalytics(path).summaries()[2].top(), [("XIV", 2, 0), ("12", 1, 0)])
+            first.clear()
+            self.assertEqual(second.recent(1, now=now), [])
+
+    def test_traffic_analytics_long_input(self):
+        """Over-long inputs are counted under a capped key, and a failed save does not raise"""
+        long_input = "X" * 70000
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "analytics.bin")
+            analytics = TrafficAnalytics(path)
+            analytics.add_input(long_input, ValueError("Invalid Roman numeral"))
+            analytics.save()
+            reloaded = TrafficAnalytics(path)
+            self.assertEqual(reloaded.estimate(long_input), 1)
+            (key, count, _), = reloaded.summaries()[2].top()
+            self.assertEqual((key, count), ("X" * 100 + "... (70000 characters)", 1))
+
+            unwritable = TrafficAnalytics(os.path.join(directory, "missing", "analytics.bin"))
+            unwritable.add_input("XIV")
+            with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                unwritable.save()
+            self.assertIn("Could not save traffic analytics", stderr.getvalue())
+            self.assertTrue(unwritable.dirty)
+
+    def test_history_replay(self):
+        """Inputs recovered from history lines are replayed with latency and rejection counts"""
+        history = ["Application started at 2024-01-01 10:00:00\n",
+                   DataLogger.conversion_message("xiv", RomanNumber("XIV"), 14) + "\n",
+                   DataLogger.conversion_message("12", DecimalNumber(12), "XII") + "\n",
+                   "Invalid Roman numeral: IIII.  A numeral cannot be repeated more than three times. (IIII is illegal)\n",
+                   "Decimal value 5000 is outside the supported range (1 or more).\n",
+                   "Invalid input. Please enter a valid Roman numeral or decimal number.\n"]
+        inputs = list(parse_history(history))
+        self.assertEqual(inputs, ["xiv", "12", "IIII", "5000"])
+
+        target = InProcessTarget(concurrency=2)
+        try:
+            report = asyncio.run(Replay(target, inputs, concurrency=2, duration=5, requests=40).run())
+        finally:
+            target.close()
+        self.assertEqual(report["requests"], 40)
+        self.assertEqual(report["rejected"], 20)
+        self.assertEqual(report["failed"], 0)
+        self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+
 
 if __name__ == '__main__':
     unittest.main()
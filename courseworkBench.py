@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from Coursework import NumberFactory, DecimalNumber, RomanNumber, DataLogger, CONVERSION_TABLE
+
+# Invalid inputs in roughly the proportions seen in real traffic: rule violations, out of range values and typos
+INVALID_INPUTS = [
+    "IIII", "XXXX", "CCCC", "VX", "LC", "DM", "IC", "IM", "XM", "VV", "LL", "DD",
+    "IXIX", "XCX", "MMMM", "MMMMCM", "0", "4000", "12A", "X1", "ABC", "", "-5", "3.5"
+]
+INVALID_ROMANS = [value for value in INVALID_INPUTS if value.isalpha() and set(value) <= set("IVXLCDM")]
+
+
+class Benchmark:
+    """
+    Measures throughput and per-call latency percentiles of one operation over a list of inputs.
+
+    The NumberFactory cache is resized to cache_size for the run (0 disables it), so that repeated
+    rounds measure parsing rather than cache lookups unless a benchmark asks for the cache.
+    """
+
+    def __init__(self, name, operation, inputs, cache_size=0):
+        self.name = name
+        self.operation = operation
+        self.inputs = inputs
+        self.cache_size = cache_size
+
+    def run(self, rounds):
+        previous_size = NumberFactory.cache.maxsize
+        NumberFactory.configure_cache(self.cache_size)
+        NumberFactory.cache.clear()
+        try:
+            return self.measure(rounds)
+        finally:
+            NumberFactory.configure_cache(previous_size)
+
+    def measure(self, rounds):
+        operation = self.operation
+        inputs = self.inputs
+
+        # Throughput: plain loop, no per-call timer overhead
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for value in inputs:
+                operation(value)
+        elapsed = time.perf_counter() - start
+
+        # Latency: every call timed individually
+        perf_counter_ns = time.perf_counter_ns
+        latencies = []
+        for value in inputs:
+            call_start = perf_counter_ns()
+            operation(value)
+            latencies.append(perf_counter_ns() - call_start)
+        latencies.sort()
+
+        calls = rounds * len(inputs)
+        return {
+            "calls": calls,
+            "ops_per_sec": calls / elapsed,
+            "p50_ns": percentile(latencies, 50),
+            "p95_ns": percentile(latencies, 95),
+            "p99_ns": percentile(latencies, 99),
+        }
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def ignore_errors(operation):
+    """Wraps operation so that the ValueError raised for invalid input is part of the measured work"""
+    def call(value):
+        try:
+            operation(value)
+        except (ValueError, KeyError):
+            pass
+    return call
+
+
+def build_benchmarks(logger):
+    decimals = list(range(1, 4000))
+    decimal_strings = [str(value) for value in decimals]
+    romans = [CONVERSION_TABLE.to_roman[value] for value in decimals]
+    mixed_inputs = decimal_strings[::10] + romans[::10] + INVALID_INPUTS * 20
+
+    return [
+        Benchmark("create_number.decimal", NumberFactory.create_number, decimal_strings),
+        Benchmark("create_number.roman", NumberFactory.create_number, romans),
+        Benchmark("create_number.invalid", ignore_errors(NumberFactory.create_number), INVALID_INPUTS * 50),
+        Benchmark("create_number.invalid.cached", ignore_errors(NumberFactory.create_number),
+                  INVALID_INPUTS * 50, cache_size=1024),
+        Benchmark("create_number.mixed", ignore_errors(NumberFactory.create_number), mixed_inputs),
+        Benchmark("create_number.mixed.cached", ignore_errors(NumberFactory.create_number), mixed_inputs,
+                  cache_size=1024),
+        Benchmark("parse.mixed", NumberFactory.parse, mixed_inputs),
+        Benchmark("DecimalNumber.convert", lambda value: DecimalNumber(value).convert(), decimals),
+        Benchmark("RomanNumber.convert.valid", lambda value: RomanNumber(value).convert(), romans),
+        Benchmark("RomanNumber.convert.invalid", ignore_errors(lambda value: RomanNumber(value).convert()),
+                  INVALID_ROMANS * 50),
+        Benchmark("DataLogger.log_data", lambda value: logger.log_data(value, "roman_to_decimal"),
+                  [f"{roman} is a RomanNumber, and its converted value is {value}"
+                   for value, roman in zip(decimals[:500], romans[:500])]),
+    ]
+
+
+def compare(results, baseline, threshold):
+    """
+    Lists the benchmarks that got slower than the baseline by more than threshold (0.1 = 10%).
+
+    Returns:
+        list: One human-readable line per regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if result["ops_per_sec"] < expected["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {result['ops_per_sec']:.0f}/s,"
+                               f" baseline {expected['ops_per_sec']:.0f}/s")
+        if result["p50_ns"] > expected["p50_ns"] * (1 + threshold):
+            regressions.append(f"{name}: p50 latency {result['p50_ns']} ns, baseline {expected['p50_ns']} ns")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the conversion and logging hot paths")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file to write the results to")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    parser.add_argument("--rounds", type=int, default=20, help="passes over each input list for throughput")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Must be the first DataLogger of the process, so logging goes to throwaway files
+        logger = DataLogger(os.path.join(directory, "history.txt"), os.path.join(directory, "data.txt"),
+                            analytics_file=os.path.join(directory, "analytics.bin"))
+        results = {}
+        for benchmark in build_benchmarks(logger):
+            if args.only and args.only not in benchmark.name:
+                continue
+            rounds = 1 if benchmark.name.startswith("DataLogger") else args.rounds
+            results[benchmark.name] = result = benchmark.run(rounds)
+            print(f"{benchmark.name:30} {result['ops_per_sec']:>12.0f} ops/s"
+                  f"  p50 {result['p50_ns']:>7} ns  p95 {result['p95_ns']:>7} ns  p99 {result['p99_ns']:>7} ns")
+        logger.flush()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one.")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
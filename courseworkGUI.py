@@ -1,12 +1,294 @@
+import itertools
+import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from Coursework import NumberFactory, NumberConverter, DecimalNumber, RomanNumber, DataLogger
+from Coursework import NumberFactory, NumberConverter, RomanNumber, DataLogger, LineIndex, IncrementalRomanParser, \
+    CONVERSION_TABLE, ROMAN_VALIDATOR
+
+
+class LogViewer(ttk.Frame):
+    """Log table that only reads the rows inside its scroll window from the history file"""
+    ROWS = 20
+    POLL_INTERVAL = 1000  # Milliseconds between checks for new log entries
+
+    def __init__(self, master, log_file):
+        super().__init__(master)
+        self.index = LineIndex(log_file)
+        self.index.refresh()
+        self.first_row = 0
+        self.follow = tk.BooleanVar(value=False)
+
+        self.log_table = ttk.Treeview(self, columns=("Log Entry",), show="headings", height=self.ROWS)
+        self.log_table.heading("Log Entry", text="Log Entry")
+        self.log_table.column("Log Entry", width=400)
+        self.log_table.grid(row=0, column=0, sticky="nsew")
+        self.log_table.bind("<MouseWheel>", self.scroll_on_wheel)
+        self.log_table.bind("<Button-4>", self.scroll_on_wheel)
+        self.log_table.bind("<Button-5>", self.scroll_on_wheel)
+
+        self.scroll_bar = ttk.Scrollbar(self, orient="vertical", command=self.scroll)
+        self.scroll_bar.grid(row=0, column=1, sticky="ns")
+
+        self.follow_switch = ttk.Checkbutton(self, text="Follow new entries", variable=self.follow,
+                                             command=self.toggle_follow)
+        self.follow_switch.grid(row=1, column=0, sticky="w", pady=(5, 0))
+
+        self.show_rows(0)
+        self.poll_id = self.after(self.POLL_INTERVAL, self.poll)
+
+    def show_rows(self, first_row):
+        """Replaces the table contents with the rows of the scroll window starting at first_row"""
+        total = len(self.index)
+        self.first_row = max(0, min(first_row, total - self.ROWS))
+        self.log_table.delete(*self.log_table.get_children())
+        for line in self.index.read_lines(self.first_row, self.ROWS):
+            self.log_table.insert("", "end", values=(line.strip(),))
+        if total:
+            self.scroll_bar.set(self.first_row / total, min(1.0, (self.first_row + self.ROWS) / total))
+        else:
+            self.scroll_bar.set(0.0, 1.0)
+
+    def scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.show_rows(int(float(amount) * len(self.index)))
+        elif action == "scroll":
+            step = self.ROWS if unit == "pages" else 1
+            self.show_rows(self.first_row + int(amount) * step)
+
+    def scroll_on_wheel(self, event):
+        direction = -1 if event.num == 4 or event.delta > 0 else 1
+        self.show_rows(self.first_row + 3 * direction)
+
+    def toggle_follow(self):
+        if self.follow.get():
+            self.show_rows(len(self.index))
+
+    def poll(self):
+        """Picks up log entries appended since the last check"""
+        if self.index.refresh():
+            self.show_rows(len(self.index) if self.follow.get() else self.first_row)
+        self.poll_id = self.after(self.POLL_INTERVAL, self.poll)
+
+    def destroy(self):
+        self.after_cancel(self.poll_id)
+        super().destroy()
+
+def preview_text(user_input, parser):
+    """
+    Describes what user_input will convert to, using parser for Roman numerals.
+
+    Text the incremental parser does not read, such as medieval or apostrophus numerals, is previewed
+    through NumberFactory.parse.
+    """
+    value = user_input.strip()
+    if not value:
+        return ""
+    if value.isascii() and value.isdigit():
+        digits = value.lstrip("0")
+        # More than four digits is out of range, and int() refuses very long digit strings
+        roman = CONVERSION_TABLE.roman(int(digits or "0")) if len(digits) <= 4 else None
+        return f"Preview: {roman}" if roman else "Preview: outside the supported range (1-3999)"
+    parsed = parser.update(value)
+    if parsed is None:
+        result = NumberFactory.parse(value)
+        if result.error is not None or result.direction != "roman_to_decimal":
+            return "Preview: not a Roman numeral or decimal number"
+        return f"Preview: {result.number.convert()}"
+    decimal_value, violated_rules = parsed
+    if violated_rules:
+        return "Preview: breaks " + ", ".join(name for name, _ in ROMAN_VALIDATOR.describe(violated_rules))
+    return f"Preview: {decimal_value}"
+
+
+class ConversionWorker(threading.Thread):
+    """
+    Converts and logs values on a background thread, so a slow disk never stalls the window.
+
+    Jobs are taken from one queue and their results put on another, which the window polls with after().
+    A single thread keeps the log entries in the order the values were submitted.
+    """
+    CHUNK_SIZE = 250  # Results reported, and logged, per queue message
+
+    def __init__(self, converter, logger):
+        super().__init__(name="conversion-worker", daemon=True)
+        self.converter = converter
+        self.logger = logger
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.job_ids = itertools.count()
+
+    def submit(self, values, cancelled=None):
+        """
+        Queues values for conversion.
+
+        Returns:
+            int: The job id that tags the job's results. The results arrive as (job_id, start, rows)
+            tuples, rows being (user_input, result, message) for values[start:start + len(rows)],
+            followed by a (job_id, None, None) tuple once the job is finished or cancelled.
+        """
+        job_id = next(self.job_ids)
+        self.jobs.put((job_id, values, cancelled))
+        return job_id
+
+    def stop(self):
+        """Lets the thread finish the jobs queued so far and exit"""
+        self.jobs.put(None)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            job_id, values, cancelled = job
+            for start in range(0, len(values), self.CHUNK_SIZE):
+                if cancelled is not None and cancelled.is_set():
+                    break
+                self.results.put((job_id, start, self.convert_chunk(values[start:start + self.CHUNK_SIZE])))
+            self.results.put((job_id, None, None))
+
+    def convert_chunk(self, values):
+        """
+        Converts and logs values, returning their table rows.
+
+        A failure becomes the message of the rows it affects instead of ending the thread, which would leave
+        every later job without an answer.
+        """
+        rows = []
+        log_entries = []
+        for user_input in values:
+            try:
+                row, log_entry = self.convert(user_input)
+            except Exception as e:
+                rows.append((user_input, "", f"Error: {e}"))
+                continue
+            rows.append(row)
+            log_entries.append(log_entry)
+        try:
+            self.logger.log_many(log_entries)
+        except Exception as e:
+            rows = [(user_input, result, f"{message} (not logged: {e})") for user_input, result, message in rows]
+        return rows
+
+    def convert(self, user_input):
+        """
+        Converts one value.
+
+        Returns:
+            tuple: ((user_input, result, message) table row, arguments for DataLogger.log_data)
+        """
+        parsed = NumberFactory.parse(user_input)
+        if parsed.error is not None:
+            return (user_input, "", parsed.message), \
+                (parsed.message, "error", user_input, None, parsed.error, parsed.rules)
+
+        number = parsed.number
+        converted_result = self.converter.convert(number)
+        log_message = DataLogger.conversion_message(user_input, number, converted_result)
+        return (user_input, str(converted_result), log_message), \
+            (log_message, parsed.direction, user_input, converted_result, None, 0)
+
+
+class BulkConversionWindow(tk.Toplevel):
+    """Converts a pasted list of values, one per line, filling in the results table as they arrive"""
+
+    def __init__(self, master, worker):
+        super().__init__(master)
+        self.title("Bulk Conversion")
+        self.worker = worker
+        self.job_id = None
+        self.cancelled = None
+        self.done = 0
+
+        self.input_label = ttk.Label(self, text="Paste Roman numerals or decimal numbers, one per line:")
+        self.input_label.pack(padx=10, pady=(10, 0), anchor="w")
+
+        self.input_text = tk.Text(self, width=60, height=8, font=("Arial", 12))
+        self.input_text.pack(padx=10, pady=5, fill="x")
+
+        self.control_frame = ttk.Frame(self)
+        self.control_frame.pack(padx=10, fill="x")
+
+        self.start_button = ttk.Button(self.control_frame, text="Convert All", command=self.start)
+        self.start_button.pack(side="left")
+
+        self.cancel_button = ttk.Button(self.control_frame, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
+        self.progress = ttk.Progressbar(self.control_frame, mode="determinate")
+        self.progress.pack(side="left", padx=5, fill="x", expand=True)
+
+        self.status_label = ttk.Label(self.control_frame, text="", width=16)
+        self.status_label.pack(side="left")
+
+        self.table_frame = ttk.Frame(self)
+        self.table_frame.pack(padx=10, pady=10, fill="both", expand=True)
+
+        self.result_table = ttk.Treeview(self.table_frame, columns=("Input", "Result", "Message"),
+                                         show="headings", height=12)
+        for column, width in (("Input", 120), ("Result", 120), ("Message", 360)):
+            self.result_table.heading(column, text=column)
+            self.result_table.column(column, width=width)
+        self.result_table.pack(side="left", fill="both", expand=True)
+
+        self.scroll_bar = ttk.Scrollbar(self.table_frame, orient="vertical", command=self.result_table.yview)
+        self.scroll_bar.pack(side="left", fill="y")
+        self.result_table.configure(yscrollcommand=self.scroll_bar.set)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def start(self):
+        values = [line.strip() for line in self.input_text.get("1.0", "end").splitlines() if line.strip()]
+        if not values:
+            return
+        self.result_table.delete(*self.result_table.get_children())
+        self.done = 0
+        self.progress.configure(maximum=len(values), value=0)
+        self.status_label.configure(text=f"0 / {len(values)}")
+        self.start_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.cancelled = threading.Event()
+        self.job_id = self.worker.submit(values, self.cancelled)
+        self.master.handlers[self.job_id] = self.show_results
+
+    def show_results(self, start, rows):
+        """Appends one chunk of results, or wraps up the job once rows is None"""
+        if rows is None:
+            self.job_id = None
+            self.start_button.configure(state="normal")
+            self.cancel_button.configure(state="disabled")
+            if self.cancelled.is_set():
+                self.status_label.configure(text=f"{self.done} / {int(self.progress['maximum'])} (cancelled)")
+            return
+        for row in rows:
+            self.result_table.insert("", "end", values=row)
+        self.done += len(rows)
+        self.progress.configure(value=self.done)
+        self.status_label.configure(text=f"{self.done} / {int(self.progress['maximum'])}")
+
+    def cancel(self):
+        if self.cancelled is not None:
+            self.cancelled.set()
+        self.cancel_button.configure(state="disabled")
+
+    def close(self):
+        self.cancel()
+        if self.job_id is not None:
+            self.master.handlers.pop(self.job_id, None)
+        self.destroy()
+
 
 class NumberConverterUI(tk.Tk):
+    POLL_INTERVAL = 50  # Milliseconds between checks for finished conversions
+    POLL_BUDGET = 0.02  # Seconds of result handling per check, so large bulk jobs cannot stall the window
+    PREVIEW_DELAY = 150  # Milliseconds of typing pause before the preview follows
+
     def __init__(self):
         super().__init__()
         self.title("Number Converter")
-        self.geometry("690x260")
+        self.geometry("690x290")
 
         self.dark_mode = False  # Initial state is light mode
         self.style = ttk.Style()
@@ -14,6 +296,9 @@ class NumberConverterUI(tk.Tk):
 
         self.converter = NumberConverter()
         self.logger = DataLogger()
+        self.worker = ConversionWorker(self.converter, self.logger)
+        self.worker.start()
+        self.handlers = {}  # Job id -> callable receiving (start, rows) for each chunk of results
 
         self.dark_mode_switch = ttk.Checkbutton(self, text="Dark Mode", command=self.toggle_dark_mode)
         self.dark_mode_switch.pack()
@@ -25,6 +310,13 @@ class NumberConverterUI(tk.Tk):
         self.input_entry.pack()
         self.input_entry.bind("<Return>", self.convert_on_enter)
         self.input_entry.bind("<space>", self.convert_on_spacebar)
+        self.input_entry.bind("<KeyRelease>", self.schedule_preview)
+
+        # The preview is computed on the main thread without logging; only Convert is recorded
+        self.preview_parser = IncrementalRomanParser(ROMAN_VALIDATOR)
+        self.preview_id = None
+        self.preview_label = ttk.Label(self, text="")
+        self.preview_label.pack()
 
         self.convert_button = ttk.Button(self, text="Convert", command=self.convert_number)
         self.convert_button.pack(pady=10)
@@ -47,42 +339,52 @@ class NumberConverterUI(tk.Tk):
         self.rules_button = ttk.Button(self.command_frame, text="Rules", command=self.display_rules)
         self.rules_button.pack(side="left", padx=5)
 
-        self.exit_button = ttk.Button(self.command_frame, text="Exit", command=self.quit)
+        self.bulk_button = ttk.Button(self.command_frame, text="Bulk", command=self.display_bulk)
+        self.bulk_button.pack(side="left", padx=5)
+
+        self.traffic_button = ttk.Button(self.command_frame, text="Traffic", command=self.display_traffic)
+        self.traffic_button.pack(side="left", padx=5)
+
+        self.exit_button = ttk.Button(self.command_frame, text="Exit", command=self.exit)
         self.exit_button.pack(side="left", padx=5)
 
+        self.protocol("WM_DELETE_WINDOW", self.exit)
+        self.poll_id = self.after(self.POLL_INTERVAL, self.poll_results)
+
     def convert_number(self):
-        user_input = self.input_entry.get()
-        try:
-            number = NumberFactory.create_number(user_input)
-            converted_result = self.converter.convert(number)
-
-            conversion_type = "decimal_to_roman" if isinstance(number, DecimalNumber) else "roman_to_decimal"
-
-            if isinstance(converted_result, tuple):
-                decimal_value, violated_rules = converted_result
-                rule_violations = []
-                for rule in violated_rules:
-                    rule_violations.append(rule[1])
-
-                log_message = f"{user_input.upper()} is a {number.__class__.__name__}," \
-                              f" and its converted value is {decimal_value}."
-                if rule_violations:
-                    log_message += " " + " ".join(rule_violations)
-
-                self.logger.log_data(log_message, conversion_type)
-                self.result_label.delete('1.0', 'end')  # Clear the text area
-                self.result_label.insert('end', log_message)
-            else:
-                self.logger.log_data(f"{user_input} is a {number.__class__.__name__},"
-                                     f" and its converted value is {converted_result}", conversion_type)
-                self.result_label.delete('1.0', 'end')  # Clear the text area
-                self.result_label.insert('end', f"{user_input} is a {number.__class__.__name__}, and its converted value is {converted_result}")
+        """Hands the entered value to the conversion worker, the result is shown once it arrives"""
+        job_id = self.worker.submit([self.input_entry.get()])
+        self.handlers[job_id] = self.show_result
 
-        except Exception as e:
-            error_message = str(e)
-            self.logger.log_data(error_message, "error")
+    def show_result(self, start, rows):
+        if rows:
             self.result_label.delete('1.0', 'end')  # Clear the text area
-            self.result_label.insert('end', error_message)
+            self.result_label.insert('end', rows[0][2])
+
+    def poll_results(self):
+        """Passes the results finished by the worker to their handlers"""
+        deadline = time.monotonic() + self.POLL_BUDGET
+        while time.monotonic() < deadline:
+            try:
+                job_id, start, rows = self.worker.results.get_nowait()
+            except queue.Empty:
+                break
+            handler = self.handlers.get(job_id)
+            if rows is None:
+                self.handlers.pop(job_id, None)
+            if handler is not None:
+                handler(start, rows)
+        self.poll_id = self.after(self.POLL_INTERVAL, self.poll_results)
+
+    def schedule_preview(self, event):
+        """Restarts the preview delay, so the preview is only updated once typing pauses"""
+        if self.preview_id is not None:
+            self.after_cancel(self.preview_id)
+        self.preview_id = self.after(self.PREVIEW_DELAY, self.update_preview)
+
+    def update_preview(self):
+        self.preview_id = None
+        self.preview_label.configure(text=preview_text(self.input_entry.get(), self.preview_parser))
 
     def convert_on_enter(self, event):
         self.convert_number()
@@ -94,50 +396,57 @@ class NumberConverterUI(tk.Tk):
         """Clears the contents of both files and reinitializes duomenys.txt"""
         confirmation = messagebox.askyesno("Clear Logs", "Are you sure you want to clear the log files?")
         if confirmation:
-            for file_path in [self.logger.log_file, self.logger.data_file]:
+            self.logger.flush()  # Buffered entries belong to the history being cleared
+            for file_path in [self.logger.log_file, self.logger.counters.path]:
                 try:
-                    open(file_path, 'w').close()
-                    if file_path == self.logger.data_file:
+                    # Statistics are reset in place, other processes may have the file mapped
+                    if file_path == self.logger.counters.path:
                         self.logger.initialize_datafile()
+                    else:
+                        open(file_path, 'w').close()
                 except FileNotFoundError:
                     messagebox.showerror("Error", f"Warning: File not found: {file_path}")
+            if self.logger.history_db is not None:
+                self.logger.history_db.clear()
+            if self.logger.analytics is not None:
+                self.logger.analytics.clear()
+                self.logger.analytics.save()
             messagebox.showinfo("Logs Cleared", "Log files have been cleared.")
 
     def print_duomenys(self):
-        data_file_path = self.logger.data_file
         try:
-            with open(data_file_path, "r") as duomenys_file:
-                duomenys_content = duomenys_file.read()
-                messagebox.showinfo("Duomenys.txt", f"Contents of duomenys.txt:\n\n{duomenys_content}")
+            duomenys_content = self.logger.format_data()
+            messagebox.showinfo("Duomenys.txt", f"Contents of duomenys.txt:\n\n{duomenys_content}")
         except FileNotFoundError:
             messagebox.showerror("Error", "Error: duomenys.txt not found.")
 
     def display_logs(self):
-        try:
-            with open(self.logger.log_file, "r") as istorija_file:
-                log_lines = istorija_file.readlines()
-
-            log_window = tk.Toplevel(self)
-            log_window.title("Logs")
+        self.logger.flush()
+        if not os.path.exists(self.logger.log_file):
+            messagebox.showerror("Error", "Error: istorija.txt not found.")
+            return
 
-            log_frame = ttk.Frame(log_window)
-            log_frame.pack(padx=10, pady=10)
+        log_window = tk.Toplevel(self)
+        log_window.title("Logs")
 
-            log_table = ttk.Treeview(log_frame, columns=("Log Entry",), show="headings")
-            log_table.heading("Log Entry", text="Log Entry")
-            log_table.column("Log Entry", width=400)
+        log_viewer = LogViewer(log_window, self.logger.log_file)
+        log_viewer.pack(padx=10, pady=10, fill="both", expand=True)
 
-            for line in log_lines:
-                log_table.insert("", "end", values=(line.strip(),))
+    def display_bulk(self):
+        BulkConversionWindow(self, self.worker)
 
-            log_table.pack(side="left", fill="both", expand=True)
+    def display_traffic(self):
+        if self.logger.analytics is None:
+            messagebox.showerror("Error", "Traffic analytics are disabled.")
+            return
 
-            scroll_bar = ttk.Scrollbar(log_frame, orient="vertical", command=log_table.yview)
-            scroll_bar.pack(side="right", fill="y")
-            log_table.configure(yscrollcommand=scroll_bar.set)
+        traffic_window = tk.Toplevel(self)
+        traffic_window.title("Traffic")
 
-        except FileNotFoundError:
-            messagebox.showerror("Error", "Error: istorija.txt not found.")
+        traffic_text = tk.Text(traffic_window, width=90, height=30, font=("Courier", 11))
+        traffic_text.pack(padx=10, pady=10, fill="both", expand=True)
+        traffic_text.insert("end", self.logger.format_analytics(minutes=30, top=20))
+        traffic_text.configure(state="disabled")
 
     def display_rules(self):
         rules_window = tk.Toplevel(self)
@@ -151,6 +460,18 @@ class NumberConverterUI(tk.Tk):
         rules_label = ttk.Label(rules_frame, text=rules_text, justify="left")
         rules_label.pack()
 
+    def exit(self):
+        """Cancels bulk jobs, lets the worker log what it has converted and closes the window"""
+        for window in self.winfo_children():
+            if isinstance(window, BulkConversionWindow):
+                window.cancel()
+        self.after_cancel(self.poll_id)
+        if self.preview_id is not None:
+            self.after_cancel(self.preview_id)
+        self.worker.stop()
+        self.worker.join()
+        self.quit()
+
     def toggle_dark_mode(self):
         self.dark_mode = not self.dark_mode
         self.set_style()
@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from Coursework import NumberFactory, NumberConverter, DataLogger
+from courseworkBench import percentile
+
+# Text around the input in the history lines of conversions (see DataLogger.conversion_message) and rejections
+INPUT_BEFORE = (" is a ", " is not a ", " represents a value outside")
+INPUT_AFTER = ("Invalid Roman numeral: ", "Decimal value ", "Roman numeral ")
+
+
+def parse_history(lines):
+    """
+    Yields the user inputs recorded in history.txt lines.
+
+    Lines without a recoverable input (start markers, bulk conversion summaries and rejections
+    that do not quote the input) are skipped.
+    """
+    for line in lines:
+        line = line.rstrip("\n")
+        for prefix in INPUT_AFTER:
+            if line.startswith(prefix):
+                rest = line[len(prefix):]
+                end = rest.find(".  ") if prefix == "Invalid Roman numeral: " else rest.find(" ")
+                if end > 0:
+                    yield rest[:end]
+                break
+        else:
+            for marker in INPUT_BEFORE:
+                end = line.find(marker)
+                if end > 0:
+                    yield line[:end]
+                    break
+
+
+class InProcessTarget:
+    """Converts and logs each request in this process, like the interactive interface does"""
+
+    def __init__(self, concurrency, logger=None):
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay")
+        self.converter = NumberConverter()
+        self.logger = logger
+
+    def call(self, value):
+        """Returns True if value was converted, False if it was rejected"""
+        result = NumberFactory.parse(value)
+        if result.error is not None:
+            if self.logger is not None:
+                self.logger.log_data(result.message, "error", value, error=result.error, rules=result.rules)
+            return False
+        converted_result = self.converter.convert(result.number)
+        if self.logger is not None:
+            self.logger.log_data(DataLogger.conversion_message(value, result.number, converted_result),
+                                 result.direction, value, converted_result)
+        return True
+
+    async def open_session(self):
+        return self
+
+    async def send(self, value):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.call, value)
+
+    async def close_session(self):
+        pass
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.logger is not None:
+            self.logger.flush()
+
+
+class ServiceSession:
+    """One connection to the conversion service, sending one request at a time"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, value):
+        self.writer.write(json.dumps(value).encode() + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("The service closed the connection.")
+        return "error" not in json.loads(line)
+
+    async def close_session(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class ServiceTarget:
+    """Sends requests to courseworkService.py, one connection per concurrent worker"""
+
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+
+    async def open_session(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        return ServiceSession(reader, writer)
+
+    def close(self):
+        pass
+
+
+class Replay:
+    """
+    Replays inputs against a target and measures throughput, latency and error rates.
+
+    With a rate, requests are scheduled open-loop at fixed intervals and latency is measured from the
+    scheduled time, so a target that falls behind shows the queueing delay instead of hiding it.
+    Without a rate every worker sends its next request as soon as the previous one is answered.
+    """
+
+    def __init__(self, target, inputs, rate=None, concurrency=1, duration=10.0, requests=None):
+        """
+        Args:
+            target: InProcessTarget or ServiceTarget.
+            inputs (list): Inputs to send, repeated in order until the run ends.
+            rate (float): Requests per second, None to send as fast as possible.
+            concurrency (int): Requests in flight at once.
+            duration (float): Seconds after which no new requests are started.
+            requests (int): If given, stop after this many requests even before duration.
+        """
+        self.target = target
+        self.inputs = inputs
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+
+    async def run(self):
+        """Returns the report of the run, see report"""
+        self.sequence = itertools.count()
+        self.latencies = []
+        self.rejected = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        await asyncio.gather(*(self.worker() for _ in range(self.concurrency)))
+        return self.report(time.perf_counter() - self.start)
+
+    async def worker(self):
+        try:
+            session = await self.target.open_session()
+        except OSError:
+            self.failed += 1
+            return
+        try:
+            while True:
+                number = next(self.sequence)
+                if self.requests is not None and number >= self.requests:
+                    return
+                if self.rate:
+                    scheduled = self.start + number / self.rate
+                    if scheduled - self.start >= self.duration:
+                        return
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    scheduled = time.perf_counter()
+                    if scheduled - self.start >= self.duration:
+                        return
+                try:
+                    converted = await session.send(self.inputs[number % len(self.inputs)])
+                except (OSError, ValueError):
+                    self.failed += 1
+                    return
+                self.latencies.append(time.perf_counter() - scheduled)
+                if not converted:
+                    self.rejected += 1
+        finally:
+            await session.close_session()
+
+    def report(self, elapsed):
+        latencies = sorted(self.latencies)
+        completed = len(latencies)
+        attempted = completed + self.failed
+        return {
+            "requests": completed,
+            "elapsed_s": elapsed,
+            "throughput_per_s": completed / elapsed if elapsed else 0.0,
+            "target_rate_per_s": self.rate,
+            "rejected": self.rejected,
+            "rejected_rate": self.rejected / completed if completed else 0.0,
+            "failed": self.failed,
+            "failed_rate": self.failed / attempted if attempted else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p90_ms": percentile(latencies, 90) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0) * 1000,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replays the inputs of history.txt as load")
+    parser.add_argument("--history", default="history.txt", help="history log to take the inputs from")
+    parser.add_argument("--service", action="store_true", help="send the requests to courseworkService.py")
+    parser.add_argument("--host", default="127.0.0.1", help="service host")
+    parser.add_argument("--port", type=int, default=8765, help="service port")
+    parser.add_argument("--no-log", action="store_true", help="in-process: convert without logging")
+    parser.add_argument("--rate", type=float, help="requests per second (default: as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.history, "r", encoding="utf-8", errors="replace") as history_file:
+            inputs = list(parse_history(history_file))
+    except FileNotFoundError:
+        parser.error(f"{args.history} not found")
+    if not inputs:
+        parser.error(f"{args.history} records no inputs to replay")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.service:
+            target = ServiceTarget(args.host, args.port)
+        else:
+            # Must be the first DataLogger of the process, so the replayed traffic is logged to throwaway files
+            logger = None if args.no_log else DataLogger(os.path.join(directory, "history.txt"),
+                                                         os.path.join(directory, "data.txt"),
+                                                         analytics_file=os.path.join(directory, "analytics.bin"))
+            target = InProcessTarget(args.concurrency, logger)
+        try:
+            report = asyncio.run(Replay(target, inputs, args.rate, args.concurrency, args.duration,
+                                        args.requests).run())
+        finally:
+            target.close()
+
+    print(f"Replayed {report['requests']} requests ({len(inputs)} history entries)"
+          f" in {report['elapsed_s']:.2f} s: {report['throughput_per_s']:.0f} requests/s")
+    print(f"Latency p50 {report['p50_ms']:.3f} ms  p90 {report['p90_ms']:.3f} ms"
+          f"  p99 {report['p99_ms']:.3f} ms  max {report['max_ms']:.3f} ms")
+    print(f"Rejected {report['rejected']} ({report['rejected_rate']:.1%}),"
+          f" failed {report['failed']} ({report['failed_rate']:.1%})")
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from Coursework import NumberFactory, NumberConverter, DataLogger
+
+
+class ConversionService:
+    """
+    Asyncio TCP server for the number converter.
+
+    Clients send one JSON request per line and get one JSON response line back, in request order,
+    so several requests can be pipelined on one connection. A request is a Roman numeral or decimal
+    number (string or integer), or a JSON array of them for a batch conversion.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, log=True, max_pending=64, max_line=1 << 20, max_log_pending=256):
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): TCP port to listen on, 0 picks a free one.
+            log (bool): Log conversions through DataLogger.
+            max_pending (int): Requests read ahead per connection before the server stops reading from it.
+            max_line (int): Longest accepted request line in bytes.
+            max_log_pending (int): Log batches waiting for the logging thread before responses wait for it.
+        """
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.max_line = max_line
+        self.converter = NumberConverter()
+        self.logger = DataLogger() if log else None
+        # A single thread keeps file I/O off the event loop and log entries in request order
+        self.log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversion-log")
+        self.log_slots = asyncio.Semaphore(max_log_pending)
+        self.server = None
+
+    def convert(self, value):
+        """
+        Converts one requested value.
+
+        Returns:
+            tuple: (response dict, arguments for DataLogger.log_data)
+        """
+        user_input = str(value)
+        parsed = NumberFactory.parse(user_input)
+        if parsed.error is not None:
+            return ({"input": user_input, "error": parsed.message},
+                    (parsed.message, "error", user_input, None, parsed.error, parsed.rules))
+
+        number = parsed.number
+        converted_result = self.converter.convert(number)
+        conversion_type = parsed.direction
+        log_message = DataLogger.conversion_message(user_input, number, converted_result)
+        result = converted_result if isinstance(converted_result, int) else str(converted_result)
+        return ({"input": user_input, "result": result, "direction": conversion_type},
+                (log_message, conversion_type, user_input, converted_result, None, 0))
+
+    async def handle_request(self, line):
+        """Answers one request line with one encoded response line"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+
+        if isinstance(request, list) and all(self.is_value(value) for value in request):
+            results = [self.convert(value) for value in request]
+            response = [result[0] for result in results]
+            await self.log([result[1] for result in results])
+        elif self.is_value(request):
+            response, log_entry = self.convert(request)
+            await self.log([log_entry])
+        else:
+            response = {"error": "Request must be a JSON string, integer or array of them."}
+        return json.dumps(response).encode() + b"\n"
+
+    @staticmethod
+    def is_value(request):
+        return isinstance(request, (str, int)) and not isinstance(request, bool)
+
+    async def log(self, log_entries):
+        """Hands log entries to the logging thread, waiting while max_log_pending batches are queued for it"""
+        if self.logger is not None and log_entries:
+            # Holding back the response stops reading the connection, so a slow disk pushes back on clients
+            await self.log_slots.acquire()
+            loop = asyncio.get_running_loop()
+            future = self.log_executor.submit(self.write_log, log_entries)
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.log_slots.release))
+
+    def write_log(self, log_entries):
+        self.logger.log_many(log_entries)
+
+    async def handle_connection(self, reader, writer):
+        pending = asyncio.Queue(self.max_pending)
+        responder = asyncio.create_task(self.respond(pending, writer))
+        try:
+            while not responder.done():
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Line longer than max_line
+                    await pending.put(b"")
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    # Blocks while max_pending requests wait, which stops reading and pushes back on the client
+                    await pending.put(line)
+        except ConnectionError:
+            pass
+        finally:
+            await pending.put(None)
+            await responder
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, pending, writer):
+        """Answers queued requests in order, waiting for the client to read when its buffer is full"""
+        try:
+            while True:
+                line = await pending.get()
+                if line is None:
+                    return
+                writer.write(await self.handle_request(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def start(self):
+        """Starts listening; the bound port is stored in self.port"""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, limit=self.max_line)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve(self):
+        """Serves until cancelled"""
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stops accepting connections and waits for pending log entries to be written"""
+        self.server.close()
+        await self.server.wait_closed()
+        self.log_executor.shutdown(wait=True)
+        if self.logger is not None:
+            self.logger.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Newline-delimited JSON conversion service")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--no-log", action="store_true", help="do not write history and statistics")
+    args = parser.parse_args(argv)
+
+    service = ConversionService(args.host, args.port, log=not args.no_log)
+    print(f"Serving conversions on {args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()